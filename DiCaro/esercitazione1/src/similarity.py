@@ -1,6 +1,5 @@
 import pandas as pd
 import nltk as nltk
-from nltk.corpus import stopwords
 import numpy as np
 from pathlib import Path
 import itertools as it
@@ -8,10 +7,13 @@ import itertools as it
 from  sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+import tln_common.resources as res
+import tln_common.text_pipeline as tp
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
+
+# shared by all preprocess calls
+_PIPELINE = tp.TextPipeline(punctuation={',', ';', '(', ')', '{', '}', ':', '?', '!', '.', "'s"},
+                            lowercase=True, lemmatize=True)
 
 def preprocess(definition):
     """Apply pre-processing logic to raw string sentence
@@ -23,20 +25,8 @@ def preprocess(definition):
         Set of Str: bag-of-word representation of the input definition
     """
 
-    # Tokenization
-    definition = definition.lower()
-    tokens = set(nltk.word_tokenize(definition))
-
-    # Removing stopwords
-    stop_words = set(stopwords.words('english'))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!', '.', "'s"}    
-    tokens = tokens.difference((stop_words.union(punct)))
-
-    # Lemmatization
-    lemmatizer = nltk.WordNetLemmatizer()
-    lemmatized_tokens = set(lemmatizer.lemmatize(token) for token in tokens)
-
-    return lemmatized_tokens
+    # Tokenization, stopwords and punctuation removal, lemmatization
+    return _PIPELINE.bow(definition, stopwords=res.nltk_stop_words('english'))
 
 
 def overlap_similarity(bow1, bow2):
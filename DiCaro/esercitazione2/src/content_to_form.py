@@ -12,12 +12,12 @@ from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity 
 import numpy as np
 
-nltk.download('wordnet')
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('averaged_perceptron_tagger')
+import tln_common.resources as res
 
 def generate_genus_candidates(concept_signature):
+    for package in ['wordnet', 'punkt', 'averaged_perceptron_tagger']:
+        res.require_nltk(package)
+
     # Step 1 pos tagging
     def_pos = {}
     for definition in concept_signature:
@@ -1,13 +1,13 @@
 from nltk.corpus import wordnet as wn
 import nltk
-from pathlib import Path
 
 import nltk.stem
 
+import tln_common.text_pipeline as tp
 
-
-# a set of common english stop words
-STOP_WORDS = set(Path('data/stop_words_FULL.txt').open('r').read().splitlines())
+# shared by all bag of word models of the module
+_PIPELINE = tp.TextPipeline(punctuation={'.',',', ';', '(', ')', '{', '}', ':', '?', '!'},
+                            lowercase=False, lemmatize=True)
 
 
 def bow_model(sentence, stopwords=None):
@@ -21,15 +21,7 @@ def bow_model(sentence, stopwords=None):
     Returns:
         set: bag of word.
     """
-    bow = set(nltk.word_tokenize(sentence))
-    punct = {'.',',', ';', '(', ')', '{', '}', ':', '?', '!'} 
-    
-    bow = bow.difference(punct)
-    if stopwords:
-        bow = bow.difference(stopwords)
-    lemmatizer = nltk.stem.WordNetLemmatizer()
-    
-    return set(lemmatizer.lemmatize(token) for token in bow)
+    return _PIPELINE.bow(sentence, stopwords)
 
 def lesk_wsd(sentence, ambiguous_word, stopwords=None):
     """ Lesk word sense disambiguation algorithm. Given ambiguous word, the algorithm use the
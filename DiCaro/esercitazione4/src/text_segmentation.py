@@ -4,16 +4,16 @@ import scipy.signal as signal
 import itertools as it
 
 import nltk
-nltk.download('punkt')
-from nltk.corpus import stopwords
-nltk.download('stopwords')
+
+import tln_common.resources as res
 
 def cosine_similarity(v1,v2):
     return 1 - distance.cosine(v1,v2)
 
 def preprocessor(chunk):
+    res.require_nltk('punkt')
     bow = set(nltk.word_tokenize(chunk.lower()))
-    stop_words = set(stopwords.words('english')) 
+    stop_words = res.nltk_stop_words('english')
     return bow.difference(stop_words)
 
 
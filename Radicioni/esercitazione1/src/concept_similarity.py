@@ -1,6 +1,8 @@
 import numpy as np
 import nltk as nl
 import math
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from nltk.corpus.reader.wordnet import WordNetError
 from nltk.corpus import wordnet as wn
 
@@ -18,7 +20,7 @@ def wu_palmer_similarity(synset1, synset2):
     Returns:
         [float]: normalized [0,1] similarity score. 0 for no similarity at all, 1 for same senses.
     """
-    subsumers = synset1.lowest_common_hypernyms(synset1, use_min_depth=True, simulate_root=False)
+    subsumers = synset1.lowest_common_hypernyms(synset2, use_min_depth=True, simulate_root=False)
     
     if len(subsumers) == 0: # no LCS found
         return None 
@@ -85,7 +87,7 @@ def leakcock_chodorow_similarity(synset1, synset2):
     max_depth = get_taxonomy_max_depth(synset1)
     dist = synset1.shortest_path_distance(synset2)
     if dist is None:
-        imilarity = 0
+        similarity = 0
     else:
         similarity = -math.log((dist+1)/(2*max_depth + 1))
 
@@ -127,4 +129,223 @@ def word_similarity(word1,word2, similarity_func, pos='n'):
         cs = None
     else:
         cs = max(sim for sim in similarities if sim is not None)
-    return cs
\ No newline at end of file
+    return cs
+
+class SynsetGraph:
+    """ Precomputed hypernym graph of a collection of synsets, used to compute the similarity
+    between one synset and all the others with vectorized numpy operations.
+
+    Each node of the graph is a synset or one of its (possibly indirect) hypernyms, the first
+    nodes are the given synsets (targets). For each node the following are computed only once:
+
+    * the distances from all its hypernyms (same as Synset._shortest_hypernym_paths).
+    * its min and max depth in the taxonomy.
+    * a posting list with all the targets that have the node as hypernym, with their distances.
+
+    The graph contains only names and numpy arrays, so it can be cheaply sent to worker processes.
+    """
+
+    def __init__(self, synsets):
+        """
+        Args:
+            synsets (list of wordnet synset): target synsets, all with the same part of speech.
+        """
+        self.n_targets = len(synsets)
+        self.taxonomy_max_depth = get_taxonomy_max_depth(synsets[0]) if synsets else 0
+
+        nodes = {syn: i for i, syn in enumerate(synsets)}
+        hypernyms_paths = []
+        visit = list(synsets)
+        for syn in visit: # visit grows with new hypernyms, so the loop covers the whole closure
+            paths = syn._shortest_hypernym_paths(simulate_root=False)
+            for hyp in paths:
+                if hyp not in nodes:
+                    nodes[hyp] = len(visit)
+                    visit.append(hyp)
+            hypernyms_paths.append(paths)
+
+        self.names = [syn.name() for syn in nodes]
+        self.min_depth = np.array([syn.min_depth() for syn in nodes], dtype=np.int32)
+        self.max_depth = np.array([syn.max_depth() for syn in nodes], dtype=np.int32)
+
+        # hypernyms of each node as parallel arrays of (node index, distance)
+        self.hypernyms = [(np.array([nodes[hyp] for hyp in paths], dtype=np.int32),
+                           np.array(list(paths.values()), dtype=np.float32)) for paths in hypernyms_paths]
+
+        # inverted index: node -> targets that have node among their hypernyms
+        postings = [([], []) for _ in nodes]
+        for target in range(self.n_targets):
+            for node, dist in zip(*self.hypernyms[target]):
+                postings[node][0].append(target)
+                postings[node][1].append(dist)
+        self.postings = [(np.array(idx, dtype=np.int32), np.array(dist, dtype=np.float32)) for idx, dist in postings]
+
+        self._distances_cache = {}
+
+    def distances(self, node, cache_size=2048):
+        """ Shortest path distances (as Synset.shortest_path_distance) between the given node and all the targets.
+        Since top level nodes are shared by almost all the targets, the results are cached.
+
+        Args:
+            node (int): index of the graph node.
+            cache_size (int, optional): max number of cached nodes. Defaults to 2048.
+
+        Returns:
+            numpy.ndarray: float32 distances, inf where no path exists.
+        """
+        if node in self._distances_cache:
+            return self._distances_cache[node]
+
+        dists = np.full(self.n_targets, np.inf, dtype=np.float32)
+        for hyp, dist in zip(*self.hypernyms[node]):
+            targets, targets_dist = self.postings[hyp]
+            dists[targets] = np.minimum(dists[targets], targets_dist + dist)
+
+        if len(self._distances_cache) >= cache_size:
+            self._distances_cache.pop(next(iter(self._distances_cache))) # evict the oldest entry
+        self._distances_cache[node] = dists
+
+        return dists
+
+    def shortest_path_row(self, target):
+        """ Vectorized shortest_path_similarity between target and all the targets.
+        """
+        dists = self.distances(target)
+        max_depth = self.taxonomy_max_depth
+        similarity = np.where(np.isinf(dists), 0, 2 * max_depth - dists)
+
+        return similarity / (2 * max_depth)
+
+    def leakcock_chodorow_row(self, target):
+        """ Vectorized leakcock_chodorow_similarity between target and all the targets.
+        """
+        dists = self.distances(target)
+        with np.errstate(divide='ignore'):
+            similarity = -np.log((dists + 1) / (2 * self.taxonomy_max_depth + 1))
+
+        return np.where(np.isinf(dists), 0, similarity)
+
+    def wu_palmer_row(self, target):
+        """ Vectorized wu_palmer_similarity between target and all the targets.
+        The LCS is chosen like Synset.lowest_common_hypernyms(use_min_depth=True): the common hypernym
+        with maximum min depth, ties are broken by synset name.
+        """
+        similarity = np.full(self.n_targets, np.nan, dtype=np.float32) # nan where there is no LCS
+        assigned = np.zeros(self.n_targets, dtype=bool)
+
+        hypernyms = self.hypernyms[target][0]
+        for lcs in sorted(hypernyms, key=lambda node: (-self.min_depth[node], self.names[node])):
+            targets = self.postings[lcs][0]
+            targets = targets[~assigned[targets]]
+            if targets.size == 0:
+                continue
+
+            lcs_dists = self.distances(lcs)
+            depth_lcs = self.max_depth[lcs] + 1 # +1 for the node itself
+            len1 = lcs_dists[target]
+            len2 = lcs_dists[targets]
+
+            similarity[targets] = (2.0 * depth_lcs) / (len1 + len2 + 2 * depth_lcs)
+            assigned[targets] = True
+
+            if assigned.all():
+                break
+
+        return similarity
+
+
+# vectorized counterparts of scalar similarity functions
+_MATRIX_KERNELS = {wu_palmer_similarity: SynsetGraph.wu_palmer_row,
+                   shortest_path_similarity: SynsetGraph.shortest_path_row,
+                   leakcock_chodorow_similarity: SynsetGraph.leakcock_chodorow_row}
+
+_worker_state = {}
+
+def _init_similarity_worker(graph, kernel, words_synsets, out_path):
+    """Worker process initializer, state is shared among all the tiles processed by the worker.
+    """
+    valid_words = np.array([i for i, syns in enumerate(words_synsets) if len(syns) > 0], dtype=np.int64)
+    occurrences = [words_synsets[i] for i in valid_words]
+
+    _worker_state['graph'] = graph
+    _worker_state['kernel'] = kernel
+    _worker_state['words_synsets'] = words_synsets
+    _worker_state['valid_words'] = valid_words
+    _worker_state['occurrences'] = np.concatenate(occurrences) if occurrences else np.array([], dtype=np.int32)
+    _worker_state['offsets'] = np.cumsum([0] + [len(syns) for syns in occurrences[:-1]]).astype(np.int64)
+    _worker_state['out_path'] = out_path
+
+def _similarity_tile(words_range):
+    """Compute and write to the memory-mapped matrix the rows of a tile of words.
+    """
+    graph = _worker_state['graph']
+    words_synsets = _worker_state['words_synsets']
+    valid_words = _worker_state['valid_words']
+    start, end = words_range
+
+    tile_words = [i for i in range(start, end) if len(words_synsets[i]) > 0]
+    if not tile_words or valid_words.size == 0:
+        return words_range
+
+    # synset-level scores, each distinct synset of the tile is computed once
+    tile_synsets, positions = np.unique(np.concatenate([words_synsets[i] for i in tile_words]), return_inverse=True)
+    synset_rows = np.vstack([_worker_state['kernel'](graph, syn) for syn in tile_synsets]).astype(np.float32)
+
+    # word-level max: first over column words senses and then over row words senses
+    cols_max = np.fmax.reduceat(synset_rows[:, _worker_state['occurrences']], _worker_state['offsets'], axis=1)
+    rows_offsets = np.cumsum([0] + [len(words_synsets[i]) for i in tile_words[:-1]])
+    words_max = np.fmax.reduceat(cols_max[positions], rows_offsets, axis=0)
+
+    matrix = np.load(_worker_state['out_path'], mmap_mode='r+')
+    matrix[np.ix_(np.array(tile_words) , valid_words)] = words_max
+    matrix.flush()
+
+    return words_range
+
+
+def similarity_matrix(words, similarity_func, pos='n', out_path=None, tile_size=256, workers=None):
+    """ Compute the word similarity (see word_similarity()) between all the pairs of the given words.
+
+    Each word is mapped to its synsets only once, then synset level scores are computed from a shared
+    SynsetGraph where hypernyms distances, depths and LCS candidates are precomputed.
+    Rows are split in tiles of words processed by a pool of worker processes.
+
+    Args:
+        words (list of str): list of N words.
+        similarity_func (function): one of wu_palmer_similarity, shortest_path_similarity, leakcock_chodorow_similarity.
+        pos (str, optional): wordnet supported part-of-speech to restrict the taxonomy to be searched. Defaults to 'n'.
+        out_path (pathlib.Path, optional): .npy file where to write the matrix. Defaults to None (temporary file).
+        tile_size (int, optional): number of words (rows) computed by each task. Defaults to 256.
+        workers (int, optional): number of worker processes. Defaults to None (number of cpus).
+
+    Raises:
+        ValueError: if no vectorized implementation exists for the given similarity function.
+
+    Returns:
+        numpy.memmap: float32 NxN matrix, nan where word_similarity() would return None.
+    """
+    if similarity_func not in _MATRIX_KERNELS:
+        raise ValueError("No vectorized implementation available for {}".format(similarity_func))
+
+    words_synsets = [wn.synsets(word, pos) for word in words]
+    synsets = list(dict.fromkeys(syn for syns in words_synsets for syn in syns)) # unique synsets, keep order
+    synset_idx = {syn: i for i, syn in enumerate(synsets)}
+    words_synsets = [np.array([synset_idx[syn] for syn in syns], dtype=np.int32) for syns in words_synsets]
+
+    if out_path is None:
+        out_path = tempfile.NamedTemporaryFile(suffix='.npy', delete=False).name
+
+    matrix = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(len(words), len(words)))
+    matrix[:] = np.nan
+    matrix.flush()
+    del matrix
+
+    graph = SynsetGraph(synsets)
+    tiles = [(start, min(start + tile_size, len(words))) for start in range(0, len(words), tile_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_similarity_worker,
+                             initargs=(graph, _MATRIX_KERNELS[similarity_func], words_synsets, out_path)) as executor:
+        for _ in executor.map(_similarity_tile, tiles):
+            pass
+
+    return np.load(out_path, mmap_mode='r')
@@ -1,4 +1,5 @@
 import csv
+from collections import namedtuple
 from pathlib import Path
 import re
 import pandas as pd
@@ -40,6 +41,50 @@ class WordSimCorpus:
             
 
 
+class WSDSentence(namedtuple('WSDSentence', ['key', 'target', 'text', 'span'])):
+    """
+    A sentence with a marked polysemous word: **<word>** (double asterisks).
+    The span is the (start, end) position of the marked word, marks included, in the text.
+    """
+
+    TARGET_RE = re.compile(r'\*\*(.*)\*\*', re.IGNORECASE)
+
+    @classmethod
+    def parse(cls, key, line):
+        """Build a sentence from a raw line of text, matching and extracting the polysemous word.
+        """
+        text = line.rstrip()
+        match = cls.TARGET_RE.search(text)
+        return cls(key=key, target=match.group(1), text=text, span=match.span())
+
+    def plain(self):
+        """Sentence without marks symbols.
+        """
+        return self.text.replace('**', '')
+
+    def replace_target(self, repl_string):
+        """Replace the marked polysemous word with repl_string. The marked word position is
+        already known, so no regex matching is required.
+        """
+        start, end = self.span
+        return self.text[:start] + repl_string + self.text[end:]
+
+
+def stream_wsd_sentences(corpus_path):
+    """ Lazily read a file of sentences with marked polysemous words, one sentence per line.
+    Unlike WSDSentences, the file is never loaded in memory, so it's suitable for very large files.
+
+    Args:
+        corpus_path (pathlib.Path): path to the sentences file.
+
+    Yields:
+        WSDSentence: parsed sentence, the key is the line number.
+    """
+    with corpus_path.open('r') as file:
+        for idx, line in enumerate(file):
+            yield WSDSentence.parse(idx, line)
+
+
 class WSDSentences:
     """
     Simple wrapper for reading txt files where each line is a sentence 
@@ -53,14 +98,13 @@ class WSDSentences:
     """
     
     def __init__(self, corpus_path):
-        self._sentences = {}
-        self._target_RE = '\*\*(.*)\*\*'
-
-        with corpus_path.open('r') as file:
-            for idx, line in enumerate(file.readlines()):
-                # match and extract polysemous word
-                poly_word = re.search(self._target_RE, line, re.IGNORECASE).group(1) 
-                self._sentences[idx] = (poly_word,line.rstrip())
+        self._sentences = {sentence.key: sentence for sentence in stream_wsd_sentences(corpus_path)}
+
+    def __iter__(self):
+        return iter(self._sentences.values())
+
+    def __len__(self):
+        return len(self._sentences)
     
     def get_sentences(self):
         """
@@ -69,8 +113,7 @@ class WSDSentences:
             List of triples: return list of triples of (key, polysemous word, sentence)
         """
 
-        return [(key, poly_word, sentence.replace('**','')) for 
-                 key, (poly_word, sentence) in self._sentences.items()]
+        return [(key, sentence.target, sentence.plain()) for key, sentence in self._sentences.items()]
 
     def replace_polysemous_word(self, key, repl_string):
         """Replace polysemous word with repl_string
@@ -82,10 +125,7 @@ class WSDSentences:
         Returns:
             (str): sentence with replaced text 
         """
-        sent_to_repl = self._sentences[key][1]
-        new_sent = re.sub(self._target_RE, repl_string, sent_to_repl)
-
-        return new_sent
+        return self._sentences[key].replace_target(repl_string)
 
 
 class SemCorCorpus():
@@ -1,9 +1,20 @@
 from nltk.corpus import wordnet as wn
 import nltk
-from pathlib import Path
+import numpy as np
 
-# a set of common english stop words
-STOP_WORDS = set(Path('data/stop_words_FULL.txt').open('r').read().splitlines())
+import tln_common.resources as res
+import tln_common.text_pipeline as tp
+
+
+def __getattr__(name):
+    # STOP_WORDS (used by the notebook) is loaded lazily on first access, so importing the module has no I/O cost
+    if name == 'STOP_WORDS':
+        return res.load_stop_words()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+# shared by all bag of word models of the module
+_PIPELINE = tp.TextPipeline(punctuation={',', ';', '(', ')', '{', '}', ':', '?', '!'},
+                            lowercase=False, lemmatize=False)
 
 
 def bow_model(sentence, stopwords=None):
@@ -17,14 +28,7 @@ def bow_model(sentence, stopwords=None):
     Returns:
         set: bag of word.
     """
-    bow = set(nltk.word_tokenize(sentence))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!'} 
-    
-    bow = bow.difference(punct)
-    if stopwords:
-        bow = bow.difference(stopwords)
-
-    return bow
+    return _PIPELINE.bow(sentence, stopwords)
 
 def lesk_wsd(sentence, ambiguous_word, stopwords=None):
     """ Lesk word sense disambiguation algorithm. Given ambiguous word, the algorithm use the
@@ -43,20 +47,233 @@ def lesk_wsd(sentence, ambiguous_word, stopwords=None):
         (wordnet synset, integer): the best sense wordnet synset and its overlap metric value
     """
     
+    context = bow_model(sentence)
+
+    return lesk_wsd_from_context(context, ambiguous_word, stopwords)
+
+def lesk_wsd_from_context(context, ambiguous_word, stopwords=None):
+    """ Same as lesk_wsd() but the disambiguation context is given already tokenized.
+    Usefull when the same sentence is used to disambiguate more than one word,
+    since the context bag of word is built only once.
+
+    Args:
+        context (set of str): bag of word of the sentence containing the ambiguous word.
+        ambiguous_word (str): ambiguous/polysemous word to disambiguate.
+        stopwords (set, optional): a set of stop words to remove. Defaults to None.
+
+    Returns:
+        (wordnet synset, integer): the best sense wordnet synset and its overlap metric value
+    """
+    senses_signatures = [(syn, sense_signature(syn, stopwords)) for syn in wn.synsets(ambiguous_word)]
+
+    return _best_sense(context, senses_signatures)
+
+def sense_signature(synset, stopwords=None):
+    """ Build the Lesk signature of a sense as a bag of word.
+
+    Args:
+        synset (wordnet synset): sense to build the signature of.
+        stopwords (set, optional): a set of stop words to remove. Defaults to None.
+
+    Returns:
+        set: bag of word of the sense signature.
+    """
+    signature  = bow_model(synset.definition(), stopwords) # gloss words
+    
+    for example in synset.examples(): # examples words
+        signature.update(bow_model(example, stopwords))
+
+    return signature
+
+def _best_sense(context, senses_signatures):
+    """ Select the sense whose signature maximally overlap with the context.
+
+    Args:
+        context (set of str): bag of word of the disambiguation context.
+        senses_signatures (list of (wordnet synset, set)): candidate senses with their signatures.
+
+    Returns:
+        (wordnet synset, integer): the best sense wordnet synset and its overlap metric value
+    """
     best_sense = None
     max_overlap = 0
 
-    context = bow_model(sentence)
-
-    for syn in wn.synsets(ambiguous_word): # foreach sense
-        signature  = bow_model(syn.definition(), stopwords) # gloss words
-        
-        for example in syn.examples(): # examples words
-            signature.union(bow_model(example, stopwords)) 
-        
+    for syn, signature in senses_signatures: # foreach sense
         overlap = len(context.intersection(signature))
         if overlap > max_overlap: # > returns the first best sense in case of overlap ties
             max_overlap = overlap
             best_sense = syn
 
-    return best_sense, max_overlap
\ No newline at end of file
+    return best_sense, max_overlap
+
+def lesk_wsd_batch(sentences, stopwords=None):
+    """ Lesk disambiguation of a collection of sentences, same results of lesk_wsd() on each sentence.
+    Senses and their signatures are looked up only once for each distinct target word.
+
+    This is a generator, so sentences are processed lazily and the input can be a stream
+    (eg. data_manager.stream_wsd_sentences()).
+
+    Args:
+        sentences (iterable of data_manager.WSDSentence): sentences with marked polysemous word.
+        stopwords (set, optional): a set of stop words to remove. Defaults to None.
+
+    Yields:
+        (data_manager.WSDSentence, wordnet synset, integer): sentence, best sense and its overlap metric value.
+    """
+    senses_signatures = {} # target word -> [(synset, signature), ...]
+
+    for sentence in sentences:
+        if sentence.target not in senses_signatures:
+            senses_signatures[sentence.target] = [(syn, sense_signature(syn, stopwords)) 
+                                                  for syn in wn.synsets(sentence.target)]
+
+        context = bow_model(sentence.plain())
+        best_sense, max_overlap = _best_sense(context, senses_signatures[sentence.target])
+
+        yield sentence, best_sense, max_overlap
+
+def substitute_senses(sentences, stopwords=None):
+    """ Disambiguate all the given sentences and substitute each polysemous word with
+    the lemmas (synonyms) of its best sense, or [NONE] if no sense is found.
+
+    Args:
+        sentences (iterable of data_manager.WSDSentence): sentences with marked polysemous word.
+        stopwords (set, optional): a set of stop words to remove. Defaults to None.
+
+    Yields:
+        (int, str, wordnet synset): sentence key, rewritten sentence and best sense (None if not found).
+    """
+    for sentence, best_sense, _ in lesk_wsd_batch(sentences, stopwords):
+        repl_string = '[{}]'.format(', '.join(best_sense.lemma_names())) if best_sense else '[NONE]'
+        yield sentence.key, sentence.replace_target(repl_string), best_sense
+
+class SignatureStore:
+    """ Store of relation-expanded sense signatures for the extended Lesk algorithm.
+
+    The signature of a synset is the bag of word of its gloss and examples, expanded with
+    the glosses of related synsets (by default hypernyms and hyponyms) up to a given depth.
+    Each signature is built only once and kept as a sorted array of integer token ids
+    (interned by the module text pipeline), so the overlap with a context is a sorted-array intersection.
+
+    To bound the cost of the expansion, a signature keeps at most max_size tokens: the tokens
+    of the synset itself come first, then the tokens of related synsets in breadth-first order.
+    """
+
+    def __init__(self, depth=1, relations=('hypernyms', 'hyponyms'), max_size=250, stopwords=None):
+        """
+        Args:
+            depth (int, optional): max distance of related synsets in the relations graph. Defaults to 1.
+            relations (tuple of str, optional): names of the wordnet Synset relation methods to follow. Defaults to ('hypernyms', 'hyponyms').
+            max_size (int, optional): max number of tokens of a signature. Defaults to 250.
+            stopwords (set, optional): set of stopwords to remove from signatures. Defaults to None.
+        """
+        self._depth = depth
+        self._relations = relations
+        self._max_size = max_size
+        self._stopwords = stopwords
+        self._signatures = {} # synset name -> sorted numpy array of token ids
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def token_ids(self, tokens):
+        """ Map tokens to a sorted array of ids. Tokens never seen in a signature are discarded
+        since they can't contribute to any overlap.
+
+        Args:
+            tokens (iterable of str): tokens to map.
+
+        Returns:
+            numpy.ndarray: sorted unique token ids.
+        """
+        ids = _PIPELINE.lookup_ids(tokens)
+        return np.unique(np.array(ids, dtype=np.int32))
+
+    def signature(self, synset):
+        """ Get the signature of a synset, building it on first request.
+
+        Args:
+            synset (wordnet synset): sense to get the signature of.
+
+        Returns:
+            numpy.ndarray: sorted unique token ids of the signature.
+        """
+        signature = self._signatures.get(synset.name())
+        if signature is None:
+            signature = self._build_signature(synset)
+            self._signatures[synset.name()] = signature
+
+        return signature
+
+    def build(self, synsets):
+        """ Precompute signatures of a collection of synsets.
+
+        Args:
+            synsets (iterable of wordnet synset): senses to precompute.
+        """
+        for synset in synsets:
+            self.signature(synset)
+
+    def _build_signature(self, synset):
+        tokens = {} # insertion ordered set of tokens
+        for text in self._signature_texts(synset):
+            tokens.update(dict.fromkeys(sorted(bow_model(text, self._stopwords)))) # sorted for deterministic truncation
+            if len(tokens) >= self._max_size:
+                break # signature is full, remaining related synsets are not tokenized at all
+        tokens = list(tokens)[:self._max_size]
+
+        ids = [_PIPELINE.token_id(token) for token in tokens]
+        return np.unique(np.array(ids, dtype=np.int32))
+
+    def _signature_texts(self, synset):
+        """ Generate signature texts by priority: synset gloss and examples, then glosses of
+        related synsets visited breadth first up to the configured depth.
+        """
+        yield synset.definition()
+        yield from synset.examples()
+
+        visited = {synset}
+        frontier = [synset]
+        for _ in range(self._depth):
+            next_frontier = []
+            for syn in frontier:
+                for relation in self._relations:
+                    for related in getattr(syn, relation)():
+                        if related not in visited:
+                            visited.add(related)
+                            next_frontier.append(related)
+                            yield related.definition()
+            frontier = next_frontier
+
+
+def extended_lesk_wsd(sentence, ambiguous_word, store):
+    """ Extended Lesk word sense disambiguation algorithm. Same as lesk_wsd() but sense
+    signatures are expanded with the glosses of related synsets, see SignatureStore.
+
+    Args:
+        sentence (string): a single sentence containing the ambiguous word.
+        ambiguous_word (str): ambiguous/polysemous word to disambiguate.
+        store (SignatureStore): store of expanded signatures, shared among calls.
+
+    Returns:
+        (wordnet synset, integer): the best sense wordnet synset and its overlap metric value
+    """
+    return extended_lesk_wsd_from_context(bow_model(sentence), ambiguous_word, store)
+
+def extended_lesk_wsd_from_context(context, ambiguous_word, store):
+    """ Same as extended_lesk_wsd() but the disambiguation context is given already tokenized.
+    """
+    best_sense = None
+    max_overlap = 0
+
+    senses = wn.synsets(ambiguous_word)
+    store.build(senses) # signatures must be built before mapping the context to ids
+    context_ids = store.token_ids(context)
+
+    for syn in senses:
+        overlap = np.intersect1d(context_ids, store.signature(syn), assume_unique=True).size
+        if overlap > max_overlap: # > returns the first best sense in case of overlap ties
+            max_overlap = overlap
+            best_sense = syn
+
+    return best_sense, max_overlap
@@ -0,0 +1,184 @@
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from nltk.wsd import lesk
+
+import src.data_manager as dm
+import tln_common.resources as res
+import src.word_sense_disambiguation as wsd
+
+"""
+Evaluation runner of WSD algorithms over all the SemCor files in data/semcor3.0.
+
+Each brown file is evaluated by a separate worker process, per-file results are then
+aggregated to obtain the overall accuracy and a throughput report with the time spent in
+each stage of the pipeline (xml parsing, context tokenization and disambiguation).
+
+The script must be executed from the esercitazione1 directory:
+
+    python -m src.wsd_evaluation --wsd lesk --workers 4
+"""
+
+STAGES = ('parse', 'tokenize', 'disambiguate')
+
+
+def custom_lesk(context, ambiguous_word, stopwords=None):
+    """ Adapter for word_sense_disambiguation.lesk_wsd with the (context, word) -> synset signature.
+
+    Args:
+        context (set of str): bag of word of the sentence.
+        ambiguous_word (str): word to disambiguate.
+        stopwords (set, optional): set of stopwords to remove from sense signatures. Defaults to None.
+
+    Returns:
+        wordnet synset: best sense, None if no sense overlap with the context.
+    """
+    return wsd.lesk_wsd_from_context(context, ambiguous_word, stopwords)[0]
+
+
+def nltk_lesk(context, ambiguous_word, stopwords=None):
+    """ Adapter for nltk.wsd.lesk reference implementation with the (context, word) -> synset signature.
+    Stopwords are ignored since nltk implementation doesn't support them.
+    """
+    return lesk(context, ambiguous_word)
+
+
+_signature_stores = {} # one store for each stopwords set (as frozenset), lazily created in each worker process
+
+def extended_lesk(context, ambiguous_word, stopwords=None):
+    """ Adapter for word_sense_disambiguation.extended_lesk_wsd with the (context, word) -> synset signature.
+    Sense signatures are shared among all the calls of the same process.
+    """
+    key = frozenset(stopwords) if stopwords is not None else None # plain sets aren't hashable
+    if key not in _signature_stores:
+        _signature_stores[key] = wsd.SignatureStore(stopwords=stopwords)
+
+    return wsd.extended_lesk_wsd_from_context(context, ambiguous_word, _signature_stores[key])[0]
+
+
+# pluggable WSD functions, each one with (context, ambiguous_word, stopwords) -> synset signature
+WSD_FUNCTIONS = {'lesk': custom_lesk,
+                 'extended_lesk': extended_lesk,
+                 'nltk_lesk': nltk_lesk}
+
+
+def evaluate_file(brown_file_path, wsd_func, stopwords=None):
+    """ Evaluate a WSD function on all annotated nouns of a single SemCor file.
+
+    Args:
+        brown_file_path (pathlib.Path): path to the SemCor brown file.
+        wsd_func (callable): WSD function with (context, ambiguous_word, stopwords) -> synset signature.
+        stopwords (set, optional): set of stopwords given to the WSD function. Defaults to None.
+
+    Returns:
+        dict: file name, counters of sentences, words and correct predictions and time (seconds) spent in each stage.
+    """
+    timings = Counter({stage: 0.0 for stage in STAGES})
+
+    start = time.perf_counter()
+    annotated_sentences = dm.SemCorCorpus(brown_file_path).get_annotated_sentences()
+    timings['parse'] += time.perf_counter() - start
+
+    n_words = 0
+    correct = 0
+    for sentence, annotated_words in annotated_sentences:
+        if not annotated_words: # nothing to disambiguate, skip tokenization
+            continue
+
+        start = time.perf_counter()
+        context = wsd.bow_model(sentence) # one context for all the words of the sentence
+        timings['tokenize'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for word, true_sense_id in annotated_words:
+            predicted_sense = wsd_func(context, word, stopwords)
+            if predicted_sense and predicted_sense.name().lower() == true_sense_id.lower():
+                correct += 1
+            n_words += 1
+        timings['disambiguate'] += time.perf_counter() - start
+
+    return {'file': Path(brown_file_path).name,
+            'sentences': len(annotated_sentences),
+            'words': n_words,
+            'correct': correct,
+            'accuracy': correct / n_words if n_words else 0.0,
+            'timings': dict(timings)}
+
+
+def evaluate_semcor(semcor_path, wsd_func, stopwords=None, workers=None):
+    """ Evaluate a WSD function over all brown files (br-*) of a SemCor directory.
+    Files are sharded among a pool of worker processes.
+
+    Args:
+        semcor_path (pathlib.Path): directory containing SemCor brown files.
+        wsd_func (callable): WSD function with (context, ambiguous_word, stopwords) -> synset signature.
+            Must be picklable (ie defined at module top level).
+        stopwords (set, optional): set of stopwords given to the WSD function. Defaults to None.
+        workers (int, optional): number of worker processes. Defaults to None (number of cpus).
+
+    Returns:
+        dict: report with per-file results, overall accuracy, sentences/sec and per-stage timings.
+    """
+    brown_files = sorted(Path(semcor_path).glob('br-*'))
+    evaluate = partial(evaluate_file, wsd_func=wsd_func, stopwords=stopwords)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        files_results = list(executor.map(evaluate, brown_files))
+    elapsed = time.perf_counter() - start
+
+    n_sentences = sum(file_res['sentences'] for file_res in files_results)
+    n_words = sum(file_res['words'] for file_res in files_results)
+    correct = sum(file_res['correct'] for file_res in files_results)
+
+    timings = Counter()
+    for file_res in files_results:
+        timings.update(file_res['timings'])
+
+    return {'files': files_results,
+            'sentences': n_sentences,
+            'words': n_words,
+            'accuracy': correct / n_words if n_words else 0.0,
+            'elapsed': elapsed,
+            'sentences_per_sec': n_sentences / elapsed if elapsed else 0.0,
+            'timings': dict(timings)} # cumulative time over all workers
+
+
+def format_report(report):
+    """Format an evaluation report as a human readable multi-line string.
+    """
+    lines = ["{:<10}{:>10}{:>8}{:>10}".format('file', 'sentences', 'words', 'accuracy')]
+    for file_res in report['files']:
+        lines.append("{:<10}{:>10}{:>8}{:>10.4f}".format(file_res['file'], file_res['sentences'], file_res['words'], file_res['accuracy']))
+
+    lines.append("Overall accuracy: {:.4f} on {} words".format(report['accuracy'], report['words']))
+    lines.append("Throughput: {:.2f} sentences/sec ({:.2f}s wall time)".format(report['sentences_per_sec'], report['elapsed']))
+    lines.append("Stage timings (cumulative over workers): " +
+                 ', '.join("{} {:.2f}s".format(stage, report['timings'][stage]) for stage in STAGES))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evaluate WSD algorithms on SemCor corpus')
+    parser.add_argument('--semcor', type=Path, default=Path('data/semcor3.0'))
+    parser.add_argument('--wsd', choices=WSD_FUNCTIONS.keys(), default='lesk')
+    parser.add_argument('--stopwords', action='store_true', help='remove stop words from sense signatures')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', type=Path, default=None, help='optional json file where to save the report')
+    args = parser.parse_args()
+
+    stopwords = res.load_stop_words() if args.stopwords else None
+    report = evaluate_semcor(args.semcor, WSD_FUNCTIONS[args.wsd], stopwords, args.workers)
+    print(format_report(report))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with args.output.open('w') as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,174 @@
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from nltk.corpus import wordnet as wn
+from nltk.corpus import framenet as fn
+
+import src.mapping as mapp
+
+"""
+Bulk alignment of all FrameNet frames to WordNet synsets.
+
+Every slot of every frame (frame name, all FEs and all LUs) is mapped with a FrameToSynsetMapper.
+Frames are distributed among a pool of worker processes, each one with its own mapper and
+already loaded WordNet/FrameNet readers.
+
+The alignment is written as a TSV file, one row for each frame slot. Completed frames are
+recorded in a checkpoint file, so an interrupted run can be resumed.
+
+The script must be executed from the esercitazione2 directory:
+
+    python -m src.bulk_alignment --output output/alignment.tsv --workers 4
+"""
+
+COLUMNS = ['frame', 'slot', 'value', 'synset_ID', 'score']
+
+_mapper = None # worker process mapper
+
+
+def frame_slots(frame):
+    """ All the slots of a frame as (slot value, slot type) pairs: the frame name, FEs and LUs.
+
+    Args:
+        frame (nltk.corpus.framenet.Frame): FrameNet frame.
+
+    Returns:
+        list of (str, mapping.FrameNetSlotType): frame slots.
+    """
+    slots = [(frame.name, mapp.FrameNetSlotType.NAME)]
+    slots.extend((fe, mapp.FrameNetSlotType.FE) for fe in frame['FE'])
+    slots.extend((lu, mapp.FrameNetSlotType.LU) for lu in frame['lexUnit'])
+
+    return slots
+
+
+def _init_worker(cache_size):
+    """Worker process initializer: build the mapper and force the loading of lexical resources.
+    """
+    global _mapper
+    cache = mapp.ContextCache(maxsize=cache_size) # shared by both context builders
+    _mapper = mapp.FrameToSynsetMapper(mapp.FrameNetContext(cache), mapp.WordNetContext(cache))
+
+    # lazy corpus readers are loaded on first access
+    wn.synsets('entity')
+    fn.frame_ids_and_names()
+
+
+def align_frame(frame_id):
+    """ Map all the slots of a frame.
+
+    Args:
+        frame_id (int): FrameNet frame id.
+
+    Returns:
+        (str, list of tuple): frame name and alignment rows (frame, slot, value, synset_ID, score).
+    """
+    frame = fn.frame(frame_id)
+    rows = []
+    for slot_value, slot_type in frame_slots(frame):
+        synset_id, score = _mapper.map_frame_slot(frame, slot_value, slot_type)
+        rows.append((frame.name, slot_type.name, slot_value, synset_id or '', score if score is not None else ''))
+
+    return frame.name, rows
+
+
+def _load_checkpoint(output_path, checkpoint_path):
+    """ Read completed frames from the checkpoint file and discard from the output
+    the rows of frames not completed (eg. process killed while writing).
+
+    Returns:
+        set of str: names of completed frames.
+    """
+    if not checkpoint_path.exists() or not output_path.exists():
+        return set()
+
+    completed = set(checkpoint_path.read_text().splitlines())
+    with output_path.open('r', newline='') as file:
+        reader = csv.reader(file, delimiter='\t')
+        next(reader, None) # skip header line
+        rows = [row for row in reader if len(row) == len(COLUMNS) and row[0] in completed]
+
+    with output_path.open('w', newline='') as file:
+        writer = csv.writer(file, delimiter='\t')
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+    return completed
+
+
+def align_framenet(output_path, checkpoint_path=None, workers=None, cache_size=50000):
+    """ Align all FrameNet frames to WordNet, resuming from the checkpoint if any.
+
+    Args:
+        output_path (pathlib.Path): TSV file where to write the alignment.
+        checkpoint_path (pathlib.Path, optional): file of completed frames. Defaults to None (output_path with .checkpoint suffix).
+        workers (int, optional): number of worker processes. Defaults to None (number of cpus).
+        cache_size (int, optional): size of the context cache of each worker. Defaults to 50000.
+
+    Returns:
+        dict: counters of aligned frames and slots, elapsed time and frames/sec.
+    """
+    output_path = Path(output_path)
+    checkpoint_path = Path(checkpoint_path or output_path.with_suffix('.checkpoint'))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    completed = _load_checkpoint(output_path, checkpoint_path)
+    if not completed: # start from scratch
+        with output_path.open('w', newline='') as file:
+            csv.writer(file, delimiter='\t').writerow(COLUMNS)
+        checkpoint_path.write_text('')
+
+    to_align = [frame_id for frame_id, name in fn.frame_ids_and_names().items() if name not in completed]
+
+    n_slots = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_size,)) as executor, \
+         output_path.open('a', newline='') as out_file, checkpoint_path.open('a') as checkpoint_file:
+        writer = csv.writer(out_file, delimiter='\t')
+        futures = [executor.submit(align_frame, frame_id) for frame_id in to_align]
+
+        for future in as_completed(futures):
+            frame_name, rows = future.result()
+            writer.writerows(rows)
+            out_file.flush()
+            checkpoint_file.write(frame_name + '\n') # frame is completed only after its rows are written
+            checkpoint_file.flush()
+            n_slots += len(rows)
+
+    elapsed = time.perf_counter() - start
+
+    return {'frames': len(to_align),
+            'resumed_frames': len(completed),
+            'slots': n_slots,
+            'elapsed': elapsed,
+            'frames_per_sec': len(to_align) / elapsed if elapsed else 0.0}
+
+
+def to_parquet(tsv_path, parquet_path):
+    """ Convert an alignment TSV file to the (more compact) Parquet format. Requires pandas with pyarrow.
+    """
+    import pandas as pd
+
+    alignment = pd.read_csv(tsv_path, sep='\t', keep_default_na=False)
+    alignment['score'] = pd.to_numeric(alignment['score'], errors='coerce').astype('Int32')
+    alignment.to_parquet(parquet_path, index=False)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Align all FrameNet frames to WordNet synsets')
+    parser.add_argument('--output', type=Path, default=Path('output/alignment.tsv'))
+    parser.add_argument('--checkpoint', type=Path, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--parquet', type=Path, default=None, help='optional parquet copy of the alignment')
+    args = parser.parse_args()
+
+    stats = align_framenet(args.output, args.checkpoint, args.workers)
+    print("Aligned {} frames ({} slots) in {:.1f}s, {:.2f} frames/sec. {} frames resumed from checkpoint".format(
+          stats['frames'], stats['slots'], stats['elapsed'], stats['frames_per_sec'], stats['resumed_frames']))
+
+    if args.parquet:
+        to_parquet(args.output, args.parquet)
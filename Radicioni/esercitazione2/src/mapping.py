@@ -1,13 +1,17 @@
 
 import nltk
-from pathlib import Path
 from enum import Enum
+from pathlib import Path
 import numpy as np
+from scipy import sparse
 
 from nltk.corpus import wordnet as wn
 from nltk.corpus import framenet as fn
 
-STOP_WORDS = set(Path('data/stop_words_FULL.txt').open('r').read().splitlines())
+import tln_common.cache as lru
+import tln_common.resources as res
+import tln_common.text_pipeline as tp
+
 
 class FrameNetSlotType(Enum):
     NAME = 0
@@ -15,16 +19,55 @@ class FrameNetSlotType(Enum):
     LU = 2
 
 
+class ContextCache(lru.LRUCache):
+    """ Bounded LRU cache of contexts, with optional on-disk persistence (see tln_common.cache).
+
+        Cached contexts are frozensets, so they can be safely shared among callers.
+        The cache can be shared by the threads of a process, bulk_alignment workers have one cache each.
+    """
+
+    def __init__(self, maxsize=50000, path=None) -> None:
+        """
+        Args:
+            maxsize (int, optional): max number of cached contexts. Defaults to 50000.
+            path (pathlib.Path, optional): file where the cache is persisted, loaded if it already exists. Defaults to None.
+        """
+        super().__init__(maxsize, path)
+
+    def get(self, key, build_context):
+        """ Get the context associated to key, building and caching it on a cache miss.
+
+        Args:
+            key (hashable): key of the context.
+            build_context (callable): function without arguments that build the context.
+
+        Returns:
+            frozenset of str: the context
+        """
+        return super().get(key, lambda: frozenset(build_context()))
+
+
 class ContextBuilder:
     """ interface that wrap methods to extract a context from 
         a given object (eg. FrameNet frame, Wordnet synset, etc.).
 
-        Here the context is represented with a bag-of-words model.
+        Here the context is represented with a bag-of-words model, built by a text pipeline
+        shared by all the builders. Contexts are memoized in a ContextCache, at text granularity too, so each
+        text (eg. a gloss shared by different contexts) is tokenized only once.
     """
 
-    def __init__(self) -> None:
+    PIPELINE = tp.TextPipeline(punctuation={'.',',', ';', '(', ')', '{', '}', 
+                                            '[', ']', "’", '‘',  '“', '”',':', '?', '!',"'"},
+                               lowercase=True, sentence_split=True, lemmatize=True)
+
+    def __init__(self, cache=None) -> None:
+        """
+        Args:
+            cache (ContextCache, optional): cache of contexts, could be shared among builders. Defaults to None (a new cache).
+        """
         self.bow_mode = None;
         self.context = None;
+        self.cache = cache if cache is not None else ContextCache()
 
 
     def get_context(self):
@@ -48,21 +91,18 @@ class ContextBuilder:
         Returns:
             set: bag of word.
         """
-        bow = set()
-        punct = {'.',',', ';', '(', ')', '{', '}', 
-                '[', ']', "’", '‘',  '“', '”',':', '?', '!',"'"} 
-        lemmatizer = nltk.WordNetLemmatizer()
+        return self.PIPELINE.bow(text, stopwords)
 
-        for sentence in nltk.sent_tokenize(text): # sentence granularity tokenization
-            sentence = sentence.lower()
-            sentence_bow = set(nltk.word_tokenize(sentence)) # word granularity tokenization
-            sentence_bow = sentence_bow.difference(punct)
+    def cached_bow_model(self, text):
+        """ Same as bow_model() with stop words removal, memoized by text.
 
-            if stopwords:
-                sentence_bow = sentence_bow.difference(stopwords)
-            bow.update(sentence_bow)
+        Args:
+            text (str): sentence from which build BOW.
 
-        return set(lemmatizer.lemmatize(token) for token in bow) # lemmatization
+        Returns:
+            frozenset: bag of word.
+        """
+        return self.cache.get(('text', text), lambda: self.bow_model(text, stopwords=res.load_stop_words()))
 
 class FrameNetContext(ContextBuilder):
     """ Context Builder to extract context from a FrameNet Frame.
@@ -72,8 +112,8 @@ class FrameNetContext(ContextBuilder):
         * Frame Elements (FE) definition.
         * Lexical Units (LU) definition.
     """
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, cache=None) -> None:
+        super().__init__(cache)
 
     def get_context(self, frame, slot_value, slot_type):
         """ Build the context from a specific slot of the frame, 3 slot types are supported:
@@ -91,9 +131,17 @@ class FrameNetContext(ContextBuilder):
             ValueError: if slot_type arg is not a FrameNetSlotType enum value.
 
         Returns:
-            [set of str]: the context of the given frame slot 
+            [frozenset of str]: the context of the given frame slot 
+        """
+        if not isinstance(slot_type, FrameNetSlotType):
+            raise ValueError("element_type is allowed only to get mapping.FrameNetElement enum values")
+
+        return self.cache.get(('frame', frame.name, slot_value, slot_type.name),
+                              lambda: self._get_context(frame, slot_value, slot_type))
+
+    def _get_context(self, frame, slot_value, slot_type):
+        """ Uncached version of get_context().
         """
-        
         definition = ""
 
         if slot_type  == FrameNetSlotType.NAME:
@@ -107,7 +155,7 @@ class FrameNetContext(ContextBuilder):
         else:
             raise ValueError("element_type is allowed only to get mapping.FrameNetElement enum values")
         
-        return self.bow_model(definition, stopwords=STOP_WORDS)
+        return self.cached_bow_model(definition)
 
 
 class WordNetContext(ContextBuilder):
@@ -123,8 +171,8 @@ class WordNetContext(ContextBuilder):
         given a distorted view of the synset sense. 
     """
     
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, cache=None) -> None:
+        super().__init__(cache)
 
     def get_context(self, synset):
         """ Build the context from a given sysnet.
@@ -133,7 +181,12 @@ class WordNetContext(ContextBuilder):
             synset (ntlk.corpus.wordnet.Synset): synset from which context is extracted
 
         Returns:
-            [set of str]: the context of the given synset 
+            [frozenset of str]: the context of the given synset 
+        """
+        return self.cache.get(('synset', synset.name()), lambda: self._get_synset_context(synset))
+
+    def _get_synset_context(self, synset):
+        """ Uncached version of get_context().
         """
         ctx = self._get_context(synset) # get synset examples sentences and gloss
         
@@ -164,17 +217,110 @@ class WordNetContext(ContextBuilder):
             [set of str]: the context for the fiven sysnet
         """
         ctx_s = set()
-        bow = self.bow_model
+        bow = self.cached_bow_model
 
-        ctx_s.update(bow(synset.definition(), stopwords=STOP_WORDS))
+        ctx_s.update(bow(synset.definition()))
         
         if examples:
             for example in synset.examples():
-                ctx_s.update(bow(example, stopwords=STOP_WORDS)) 
+                ctx_s.update(bow(example)) 
         
         return ctx_s
 
 
+class SenseContextIndex:
+    """ Sparse index of synset contexts, used to score all the candidate senses of a slot at once.
+
+        Each synset context is stored as a sorted array of token ids (interned by ContextBuilder.PIPELINE).
+        The contexts of a set of candidate synsets form a binary CSR matrix (synsets x tokens), which
+        is an inverted index from tokens to the synsets containing them: the overlap between a
+        frame context and every candidate is a single sparse matrix product.
+
+        Id arrays and candidates matrices are kept in a bounded LRU cache, and frame contexts are only
+        looked up in the vocabulary (never interned), so memory stays bounded on the whole FrameNet.
+    """
+
+    def __init__(self, wordnet_context_builder, cache=None) -> None:
+        """
+        Args:
+            wordnet_context_builder (WordNetContext): builder of synset contexts.
+            cache (tln_common.cache.LRUCache, optional): cache of synsets id arrays and lemmas candidates.
+                Defaults to None (a new cache of 50000 entries).
+        """
+        self._wn_ctx_builder = wordnet_context_builder
+        self._pipeline = ContextBuilder.PIPELINE
+        self._cache = cache if cache is not None else lru.LRUCache(maxsize=50000)
+
+    def context_ids(self, context):
+        """ Map a bag of word context to a sorted array of token ids, interning new tokens.
+        """
+        return np.unique(np.array([self._pipeline.token_id(token) for token in context], dtype=np.int32))
+
+    def lookup_context_ids(self, context):
+        """ Same as context_ids() without interning: tokens never seen in a synset context are discarded,
+        since they can't overlap with any of them.
+        """
+        return np.unique(np.array(self._pipeline.lookup_ids(context), dtype=np.int32))
+
+    def _synset_context(self, synset):
+        return self._cache.get(('synset', synset.name()), 
+                               lambda: _read_only(self.context_ids(self._wn_ctx_builder.get_context(synset))))
+
+    def candidates(self, lemma):
+        """ Candidate senses of a lemma with their contexts matrix, built once for each lemma (while cached).
+
+        Args:
+            lemma (str): lemma for senses to search.
+
+        Returns:
+            (tuple of str, scipy.sparse.csr_matrix): synsets names and binary (synsets x tokens) contexts matrix.
+        """
+        return self._cache.get(('lemma', lemma), lambda: self._build_candidates(lemma))
+
+    def _build_candidates(self, lemma):
+        synsets = wn.synsets(lemma)
+        rows = [self._synset_context(synset) for synset in synsets]
+        indptr = np.cumsum([0] + [len(row) for row in rows])
+        indices = np.concatenate(rows) if rows else np.array([], dtype=np.int32)
+        matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                   shape=(len(rows), len(self._pipeline)))
+
+        return tuple(synset.name() for synset in synsets), matrix
+
+    def contexts_matrix(self, contexts, n_tokens):
+        """ Binary CSR matrix (contexts x tokens) of a list of bag of word contexts.
+        Tokens with id >= n_tokens are discarded since they can't overlap with any indexed context.
+        """
+        rows = [ids[ids < n_tokens] for ids in (self.lookup_context_ids(ctx) for ctx in contexts)]
+        indptr = np.cumsum([0] + [len(row) for row in rows])
+        indices = np.concatenate(rows) if rows else np.array([], dtype=np.int32)
+
+        return sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                 shape=(len(rows), n_tokens))
+
+    def overlaps(self, contexts, lemma):
+        """ Overlap (number of common tokens) between each context and each candidate sense of lemma.
+
+        Args:
+            contexts (list of set of str): bag of word contexts (eg. frame slots contexts).
+            lemma (str): lemma for senses to search.
+
+        Returns:
+            (list of str, numpy.ndarray): candidate synsets names and (contexts x synsets) overlap matrix.
+        """
+        senses_id, senses_matrix = self.candidates(lemma)
+        contexts_matrix = self.contexts_matrix(contexts, senses_matrix.shape[1])
+
+        return senses_id, (contexts_matrix @ senses_matrix.T).toarray()
+
+
+def _read_only(array):
+    """ Mark an array read-only, so it can be safely shared from a cache.
+    """
+    array.setflags(write=False)
+    return array
+
+
 class FrameToSynsetMapper():
     """ A mapper object to map a FrameNet frame slot to a wordnet sense (synset).
 
@@ -187,6 +333,7 @@ class FrameToSynsetMapper():
     def __init__(self, framenet_context_builder, wordnet_context_builder ) -> None:
         self._fn_ctx_builder = framenet_context_builder
         self._wn_ctx_builder = wordnet_context_builder
+        self._sense_index = SenseContextIndex(wordnet_context_builder)
 
     def map(self, frame_name, slot_value, slot_type):
         """ Map a FrameNet frame to a wordnet sense.
@@ -199,10 +346,24 @@ class FrameToSynsetMapper():
         Returns:
             nltk.corpus.wordnet.Synset: best wordnet sense for the given frame slot value.
         """
-        synset_lemma = slot_value.split('.')[0] # get rid of POS (eg. existence.n)
         frame = fn.frame(frame_name)
 
-        return self._best_sense(frame, slot_value, slot_type, synset_lemma)
+        return self.map_frame_slot(frame, slot_value, slot_type)[0]
+
+    def map_frame_slot(self, frame, slot_value, slot_type):
+        """ Same as map() but with an already loaded frame and returning also the mapping score.
+
+        Args:
+            frame (nltk.corpus.framenet.Frame): FrameNet frame
+            slot_value (str): value of the slot to map.
+            slot_type (FrameNetSlotType): type of the slot to map
+
+        Returns:
+            (str, int): best wordnet sense for the given frame slot value and its overlap score, (None, None) if there are no senses.
+        """
+        synset_lemma = slot_value.split('.')[0] # get rid of POS (eg. existence.n)
+
+        return self._best_scored_sense(frame, slot_value, slot_type, synset_lemma)
 
 
     def _best_sense(self, frame, slot_value, slot_type, synset_lemma):
@@ -218,20 +379,22 @@ class FrameToSynsetMapper():
         Returns:
             nltk.corpus.wordnet.Synset: best wordnet sense for the given frame slot value.
         """
-        
+        return self._best_scored_sense(frame, slot_value, slot_type, synset_lemma)[0]
+
+    def _best_scored_sense(self, frame, slot_value, slot_type, synset_lemma):
+        """ Same as _best_sense() but returns a pair (best sense, overlap score).
+        """
         fn_ctx = self._fn_ctx_builder.get_context(frame, slot_value, slot_type)
-        scores = []
-        senses_id = []
         
-        for synset in wn.synsets(synset_lemma): 
-            wn_ctx = self._wn_ctx_builder.get_context(synset)
-            scores.append(self._score_sense(fn_ctx, wn_ctx))
-            senses_id.append(synset.name())
+        # same as _score_sense() for all the candidate senses at once
+        senses_id, overlaps = self._sense_index.overlaps([fn_ctx], synset_lemma)
+        scores = overlaps[0] + 1 # |ctx(w) + ctx(s)| + 1 
 
         idx_max = np.argmax(scores) if len(scores) > 0 else None
         best_sense = senses_id[idx_max] if idx_max is not None else None
+        best_score = int(scores[idx_max]) if idx_max is not None else None
         
-        return best_sense 
+        return best_sense, best_score
 
     def _score_sense(self, framenet_context, wordnet_context):
         """Given a Frame context and a synset context compute the context overlapping measure
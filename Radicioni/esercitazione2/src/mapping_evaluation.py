@@ -0,0 +1,154 @@
+import csv
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from nltk.corpus import framenet as fn
+
+import src.mapping as mapp
+
+"""
+Evaluation of FrameToSynsetMapper against the gold annotations in data/annotations.tsv.
+
+The evaluator reports the accuracy for each slot type (NAME, FE, LU) and a time profile split in:
+
+* framenet: FrameNet frames lookup.
+* context: frames and synsets context construction (tokenization excluded).
+* tokenization: bag of word models building.
+* scoring: candidate senses lookup and overlap scoring (context construction excluded).
+
+The report is emitted as JSON to track both quality and speed across versions.
+The script must be executed from the esercitazione2 directory:
+
+    python -m src.mapping_evaluation --output output/mapping_evaluation.json
+"""
+
+STAGES = ('framenet', 'context', 'tokenization', 'scoring')
+
+
+class StageProfiler:
+    """ Accumulate the time spent in named stages. Stages can be nested, the time of
+    a stage is exclusive, ie the time spent in nested stages is not counted twice.
+    """
+
+    def __init__(self) -> None:
+        self.timings = Counter({stage: 0.0 for stage in STAGES})
+        self._stack = [] # [stage name, start time, nested stages time]
+        self._profiled = [] # (object, method name) pairs
+
+    @contextmanager
+    def stage(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            name, start, nested = self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.timings[name] += elapsed - nested
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def profile(self, obj, method_name, stage):
+        """ Profile a method of an object instance: the method is replaced by a wrapper
+        that runs the original one inside the given stage.
+        """
+        method = getattr(obj, method_name)
+
+        def profiled(*args, **kwargs):
+            with self.stage(stage):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, profiled)
+        self._profiled.append((obj, method_name))
+
+    def restore(self):
+        """ Restore all the profiled methods.
+        """
+        for obj, method_name in reversed(self._profiled):
+            delattr(obj, method_name) # the instance attribute shadows the class method
+        self._profiled.clear()
+
+
+def accuracy(true, predicted):
+    """ Fraction of correct predictions, missing predictions count as wrong ones.
+    """
+    correct_predictions = sum([true_sense.lower() == predicted_sense.lower() for true_sense, predicted_sense in zip(true, predicted)
+                              if true_sense and predicted_sense])
+    return correct_predictions / len(true) if len(true) else 0.0
+
+
+def read_annotations(annotations_path):
+    """ Read the gold annotations file.
+
+    Returns:
+        list of dict: rows with frame, slot, value, definition and synset_ID keys.
+    """
+    with annotations_path.open('r', newline='') as file:
+        reader = csv.DictReader(file, delimiter='\t', skipinitialspace=True)
+        return [{key: value.strip() for key, value in row.items()} for row in reader]
+
+
+def evaluate_mapper(annotations, mapper=None):
+    """ Map every annotated frame slot and compare the result with the gold synset.
+
+    Args:
+        annotations (list of dict): gold annotations, see read_annotations().
+        mapper (mapping.FrameToSynsetMapper, optional): mapper to evaluate. Defaults to None (a new mapper with default context builders).
+
+    Returns:
+        dict: accuracy (overall and per slot type), number of rows, elapsed time and time profile.
+    """
+    if mapper is None:
+        mapper = mapp.FrameToSynsetMapper(mapp.FrameNetContext(), mapp.WordNetContext())
+
+    profiler = StageProfiler()
+    profiler.profile(mapper._fn_ctx_builder, 'get_context', 'context')
+    profiler.profile(mapper._wn_ctx_builder, 'get_context', 'context')
+    profiler.profile(mapper._fn_ctx_builder.PIPELINE, 'bow', 'tokenization')
+    profiler.profile(mapper._sense_index, 'overlaps', 'scoring')
+
+    true_senses = defaultdict(list)
+    predicted_senses = defaultdict(list)
+    frames = {}
+
+    start = time.perf_counter()
+    try:
+        for row in annotations:
+            with profiler.stage('framenet'):
+                if row['frame'] not in frames:
+                    frames[row['frame']] = fn.frame(row['frame'])
+
+            slot_type = mapp.FrameNetSlotType[row['slot']]
+            predicted, _ = mapper.map_frame_slot(frames[row['frame']], row['value'], slot_type)
+
+            true_senses[slot_type.name].append(row['synset_ID'])
+            predicted_senses[slot_type.name].append(predicted)
+    finally:
+        profiler.restore()
+    elapsed = time.perf_counter() - start
+
+    report_accuracy = {slot: accuracy(true_senses[slot], predicted_senses[slot]) for slot in true_senses}
+    report_accuracy['overall'] = accuracy(sum(true_senses.values(), []), sum(predicted_senses.values(), []))
+
+    return {'accuracy': report_accuracy,
+            'rows': {slot: len(senses) for slot, senses in true_senses.items()},
+            'elapsed': elapsed,
+            'profile': dict(profiler.timings)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evaluate FrameNet to WordNet mapping against gold annotations')
+    parser.add_argument('--annotations', type=Path, default=Path('data/annotations.tsv'))
+    parser.add_argument('--output', type=Path, default=None, help='optional json file where to save the report')
+    args = parser.parse_args()
+
+    report = json.dumps(evaluate_mapper(read_annotations(args.annotations)), indent=2)
+    print(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(report)
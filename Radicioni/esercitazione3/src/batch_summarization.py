@@ -0,0 +1,201 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+
+import src.data_manager as dm
+import src.text_summarization as summ
+import src.topic_extraction as te
+
+"""
+Batch summarization of many documents with the format parsed by data_manager.parse_document_paragraph().
+
+Documents are summarized by a pool of worker threads sharing the same Nasari resource
+(loaded once, from the text file or from the memory-mapped binary format), the same
+cache of per-lemma context lookups and the thread-safe text pipeline of topic_extraction,
+whose NLTK resources are loaded by the main thread before starting the workers. TextSummarizer holds no per-document state, so a single
+instance is shared by all the workers.
+
+For each document a summary is written in the output directory (one section for each compression
+ratio) and the relevance of its chunks is appended to scores.jsonl. A document is completed only
+when its scores line is written, so an interrupted run is resumed skipping completed documents.
+The script must be executed from the esercitazione3 directory:
+
+    python -m src.batch_summarization data/text-documents --output output/summaries --workers 4
+"""
+
+SCORES_FILE = 'scores.jsonl'
+
+
+class CachedContext():
+    """Nasari wrapper caching the lookup of each lemma (vector or missing lemma),
+    useful with MmapNasari where vectors are decoded on lookup.
+
+    The cache is a plain dict shared by all threads: concurrent misses of the same lemma
+    just decode the same vector twice, and hits/misses counters are approximate.
+    """
+
+    def __init__(self, nasari):
+        """
+        Args:
+            nasari (data_manager.Nasari or data_manager.MmapNasari): nasari lexical resource.
+        """
+        self._nasari = nasari
+        self._vectors = {} # lemma -> nasari vector, None if lemma is not in nasari
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def build_context(self, tokens):
+        """Same as data_manager.Nasari.build_context() with cached lookups.
+        """
+        context = []
+        for token in tokens:
+            if token in self._vectors:
+                self.hits += 1
+            else:
+                self.misses += 1
+                vectors = self._nasari.build_context([token])
+                self._vectors[token] = vectors[0] if vectors else None
+
+            if self._vectors[token] is not None:
+                context.append(self._vectors[token])
+
+        return context
+
+
+def load_nasari(nasari_path):
+    """Load nasari from the text file or, when nasari_path is a directory, from the binary format
+    written by data_manager.convert_nasari().
+    """
+    return dm.MmapNasari(nasari_path) if nasari_path.is_dir() else dm.Nasari(nasari_path)
+
+
+def iter_documents(source):
+    """Documents to summarize as (document id, data_manager.Document) pairs.
+
+    Args:
+        source (pathlib.Path or iterable): directory of .txt documents (the id is the file name stem)
+            or iterable of (document id, document text) pairs, eg. read from a stream.
+    """
+    if isinstance(source, Path):
+        for document_path in sorted(source.glob('*.txt')):
+            yield document_path.stem, dm.parse_document_paragraph(document_path)
+    else:
+        for document_id, text in source:
+            yield document_id, dm.parse_paragraph_lines(text.splitlines())
+
+
+def _completed_documents(scores_path):
+    """Ids of the documents already summarized, ie with a complete line in the scores file.
+    """
+    if not scores_path.exists():
+        return set()
+
+    completed = set()
+    with scores_path.open('r') as file:
+        for line in file:
+            try:
+                completed.add(json.loads(line)['document'])
+            except (json.JSONDecodeError, KeyError): # line truncated by an interrupted run
+                pass
+
+    return completed
+
+
+def summarize_documents(source, nasari, output_dir, compression_ratios=(10, 30, 60, 90), workers=None, topic_cache=None):
+    """Summarize a collection of documents, resuming from the documents already in output_dir.
+
+    Args:
+        source (pathlib.Path or iterable): documents to summarize, see iter_documents().
+        nasari (data_manager.Nasari or data_manager.MmapNasari): nasari lexical resource shared by all workers.
+        output_dir (pathlib.Path): directory where to write the summaries and the scores file.
+        compression_ratios (iterable of int, optional): compression ratios of each summary. Defaults to (10, 30, 60, 90).
+        workers (int, optional): number of worker threads. Defaults to None (ThreadPoolExecutor default).
+        topic_cache (topic_extraction.TopicCache, optional): cache of chunk tokens, eg. shared among
+            runs over revisions of the same documents. Defaults to None (a new cache).
+
+    Returns:
+        dict: counters of summarized and resumed documents, context and topic caches statistics, elapsed time and documents/sec.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scores_path = output_dir / SCORES_FILE
+    completed = _completed_documents(scores_path)
+
+    te.load_resources() # before starting the workers, NLTK lazy loaders are not thread-safe
+    context = CachedContext(nasari)
+    topic_cache = topic_cache if topic_cache is not None else te.TopicCache()
+    summarizer = summ.TextSummarizer(main_extractor=te.TitleExtractor(context, topic_cache),
+                                     chunk_extractor=te.TopicExtractor(context, topic_cache))
+
+    def summarize(document_id, document):
+        relevance = summarizer.score_chunks(document) # score once for all compression ratios
+        summaries = [(ratio, summarizer.summary_from_scores(document, relevance, ratio, debug=True))
+                     for ratio in compression_ratios]
+        return document_id, relevance, summaries
+
+    def write(future):
+        document_id, relevance, summaries = future.result()
+
+        with (output_dir / document_id).open('w') as file:
+            for ratio, summary in summaries:
+                file.write("Compression Level: {}%\n".format(ratio))
+                file.write(summary)
+                file.write("\n_____________________________________________________________\n")
+
+        scores_file.write(json.dumps({'document': document_id, 'relevance': relevance.tolist()}) + '\n')
+        scores_file.flush()
+
+    workers = workers or min(32, os.cpu_count() + 4) # ThreadPoolExecutor default
+    n_documents = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor, scores_path.open('a') as scores_file:
+        pending = set() # bounded, so documents are read from the source only when needed
+        for document_id, document in iter_documents(source):
+            if document_id in completed:
+                continue
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done: # only the main thread writes outputs
+                    write(future)
+            pending.add(executor.submit(summarize, document_id, document))
+            n_documents += 1
+
+        for future in as_completed(pending):
+            write(future)
+
+    elapsed = time.perf_counter() - start
+
+    return {'documents': n_documents,
+            'resumed_documents': len(completed),
+            'cache_hits': context.hits,
+            'cache_misses': context.misses,
+            'topic_cache': topic_cache.stats(),
+            'elapsed': elapsed,
+            'documents_per_sec': n_documents / elapsed if elapsed else 0.0}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Summarize all the documents of a directory')
+    parser.add_argument('documents', type=Path, help='directory of documents to summarize')
+    parser.add_argument('--nasari', type=Path, default=Path('data/dd-small-nasari-15.txt'),
+                        help='nasari file or directory of the memory-mapped format')
+    parser.add_argument('--output', type=Path, default=Path('output/summaries'))
+    parser.add_argument('--compression', type=int, nargs='+', default=[10, 30, 60, 90])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--topic-cache', type=Path, default=None, help='optional file where to persist the cache of chunk tokens')
+    args = parser.parse_args()
+
+    topic_cache = te.TopicCache(path=args.topic_cache)
+    stats = summarize_documents(args.documents, load_nasari(args.nasari), args.output, args.compression, args.workers, topic_cache)
+    if args.topic_cache:
+        topic_cache.save()
+    print("Summarized {} documents in {:.1f}s, {:.2f} documents/sec. {} documents resumed, context cache {} hits / {} misses".format(
+          stats['documents'], stats['elapsed'], stats['documents_per_sec'], stats['resumed_documents'],
+          stats['cache_hits'], stats['cache_misses']))
+    print("Topic cache: {hits} hits / {misses} misses, {size} chunks".format(**stats['topic_cache']))
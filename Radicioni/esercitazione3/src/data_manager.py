@@ -1,9 +1,13 @@
 from os import name
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
 from pathlib import Path
 from collections import namedtuple
 """Note: esercitazione3/data/dd-small-nasari-15.txt is a different version from the original uploaded on moodle!
 The original version contains some errors (some babel name contains ';' char, when ';' is the delimiter char!!) that have been manually fixed"""
 import nltk
+import numpy as np
 
 Document = namedtuple('Document', ['title', 'body', 'source'])
 
@@ -21,10 +25,20 @@ def parse_document_paragraph(document_path):
     """
     
     with document_path.open('r') as file:
-        source =  next(file)[2:].strip() # jump '# ' chars 
-        next(file) # empty line after title
-        title = next(file).strip()
-        body = [line.strip() for line in file if line.strip() != ''] # paragraph level segmentation
+        return parse_paragraph_lines(file)
+
+def parse_paragraph_lines(lines):
+    """ Same as parse_document_paragraph() but the document is given as an iterable of lines (eg. a file
+    or text.splitlines()), so documents can also come from a stream instead of a file.
+
+    Args:
+        lines (iterable of str): lines of the document
+    """
+    lines = iter(lines)
+    source =  next(lines)[2:].strip() # jump '# ' chars 
+    next(lines) # empty line after title
+    title = next(lines).strip()
+    body = [line.strip() for line in lines if line.strip() != ''] # paragraph level segmentation
 
     return Document(title=title, body=body, source=source)
 
@@ -51,14 +65,104 @@ def parse_document_sentence(document_path):
     return Document(title=title, body=body, source=source)
 
 
+class NasariVector():
+    """A nasari vector stored as parallel arrays of lemma ids (sorted) and ranks.
+
+    The rank of a component is its 1-based position in the original vector, where
+    components are ordered by descending score. Sorted ids allow to intersect vectors
+    with a merge, ranks give O(1) access to the rank of each shared component.
+    """
+
+    __slots__ = ('lemma_ids', 'ranks', 'components', '_ranks_by_lemma')
+
+    def __init__(self, components, lemma_ids, ranks):
+        """
+        Args:
+            components (list of tuple): vector components (lemma, score) ordered by descending score.
+            lemma_ids (numpy.ndarray): sorted ids of the (distinct) lemmas of the components.
+            ranks (numpy.ndarray): rank of each lemma in lemma_ids.
+        """
+        self.components = components
+        self.lemma_ids = lemma_ids
+        self.ranks = ranks
+        self._ranks_by_lemma = None # built on first use
+
+    def __len__(self):
+        return len(self.components)
+
+    @property
+    def ranks_by_lemma(self):
+        """dict: lemma -> rank of the vector components.
+        """
+        ranks_by_lemma = self._ranks_by_lemma
+        if ranks_by_lemma is None:
+            ranks_by_lemma = {}
+            for pos, (lemma, _) in enumerate(self.components, start=1):
+                ranks_by_lemma.setdefault(lemma, pos) # first occurrence of repeated lemmas
+            self._ranks_by_lemma = ranks_by_lemma # published only once complete, other threads never see it half built
+
+        return ranks_by_lemma
+
+    def rank(self, lemma):
+        """Rank of a vector component, 0 if the lemma is not a component of the vector.
+        """
+        return self.ranks_by_lemma.get(lemma, 0)
+
+
+def pack_ranks(lemma_ids, lengths):
+    """Sort by lemma id the components of many vectors stored one after the other and compute their ranks.
+    Repeated lemmas of a vector (eg. lemmas that differ only in case) keep only the first occurrence.
+
+    Args:
+        lemma_ids (numpy.ndarray): lemma ids of all vectors components, in original order.
+        lengths (numpy.ndarray): number of components of each vector.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray): sorted lemma ids, ranks and offsets of each vector (len(lengths) + 1).
+    """
+    vector_idx = np.repeat(np.arange(len(lengths)), lengths)
+    ranks = np.arange(len(lemma_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths) + 1
+
+    order = np.lexsort((ranks, lemma_ids, vector_idx))
+    lemma_ids, ranks, vector_idx = lemma_ids[order], ranks[order], vector_idx[order]
+
+    first = np.ones(len(lemma_ids), dtype=bool)
+    first[1:] = (lemma_ids[1:] != lemma_ids[:-1]) | (vector_idx[1:] != vector_idx[:-1])
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(vector_idx[first], minlength=len(lengths)))))
+
+    return lemma_ids[first].astype(np.int32), ranks[first].astype(np.int32), offsets
+
+
+def parse_nasari_line(line):
+    """Parse a line of a nasari lexical resource file.
+
+    Args:
+        line (str): line with format "babel synset id;key;lemma1_score1;...;lemmak_scorek".
+
+    Returns:
+        (str, list of tuple): key and vector components (lemma, score), both lowercased.
+    """
+    parsed_chunks = line.split(';')
+    babel_synset = parsed_chunks[1].lower()
+    nasari_vector = []
+    for chunk in parsed_chunks[2:]:
+        if len(chunk) > 1:
+            lemma, score = chunk.split('_')
+            nasari_vector.append((lemma.lower(), float(score))) # normalize text with lower()
+
+    return babel_synset, nasari_vector
+
+
 class Nasari():
     """Class to load represent Nasari lexical resource.
 
     This class represent nasari as dictionary of sparse vectors:
-    {key1: [(lemma1, score1), ..., (lemmak, scorek)], ...}
+    {key1: NasariVector, ...}
 
     Where key is the name of the word/lemma found after babel sysnset id in the nasari file;
-    each item of the dictionary is a nasari vector, represented as list of tuples.
+    each item of the dictionary is a nasari vector, with the original list of (lemma, score) tuples
+    as components and the arrays of interned lemma ids and ranks used by similarity measures.
+    Lemma ids and ranks of all vectors are packed in two arrays, each vector is a view of them.
     """
 
     def __init__(self, nasari_path):
@@ -67,25 +171,30 @@ class Nasari():
         Args:
             nasari_path (pathlib.Path): file of nasari lexical resource.
         """
-        self._nasari_dict = {}
+        self._lemma_ids = {} # lemma -> id, shared by all vectors
+        keys, vectors, lemma_ids = [], [], []
 
         with nasari_path.open('r') as file:
-            for i,line in enumerate(file.readlines()):
-                parsed_chunks = line.split(';')
-                babel_synset = parsed_chunks[1].lower()
-                nasari_vector = []
-                for chunk in parsed_chunks[2:]:
-                    if len(chunk) > 1:
-                        lemma, score = chunk.split('_')
-                        nasari_vector.append((lemma.lower(), float(score))) # normalize text with lower()
-                        
-                self._nasari_dict[babel_synset] = nasari_vector # build dictionary for each line of the file
+            for line in file:
+                babel_synset, nasari_vector = parse_nasari_line(line)
+                lemma_ids.extend(self._lemma_ids.setdefault(lemma, len(self._lemma_ids)) for lemma, _ in nasari_vector)
+                keys.append(babel_synset)
+                vectors.append(nasari_vector)
+
+        lengths = np.array([len(vector) for vector in vectors], dtype=np.int64)
+        self._ids, self._ranks, offsets = pack_ranks(np.array(lemma_ids, dtype=np.int32), lengths)
+
+        self._nasari_dict = {} # build dictionary for each line of the file
+        for key, vector, start, end in zip(keys, vectors, offsets[:-1].tolist(), offsets[1:].tolist()):
+            self._nasari_dict[key] = NasariVector(vector, self._ids[start:end], self._ranks[start:end])
 
     def get_vector(self, synset_name):
-        return self._nasari_dict[synset_name]
-    
+        """Components of a nasari vector as list of tuples (lemma, score).
+        """
+        return self._nasari_dict[synset_name].components
+
     def get_vectors(self):
-        return self._nasari_dict;
+        return {key: vector.components for key, vector in self._nasari_dict.items()}
 
     def build_context(self, tokens):
         """A nasari context is just a collection of lexical nasari vectors 
@@ -95,7 +204,173 @@ class Nasari():
             tokens (iterable): a collection of tokens.
 
         Returns:
-            list: a list of nasari vectors, one for each input token. 
+            list of NasariVector: a list of nasari vectors, one for each input token. 
         """
         return [self._nasari_dict[token] for token in tokens if token in self._nasari_dict]
-    
\ No newline at end of file
+
+
+class PackedStrings(Sequence):
+    """Read-only sequence of strings stored as a blob of utf-8 bytes and an array of offsets.
+    Strings are decoded on access, so both arrays can be memory-mapped.
+    """
+
+    def __init__(self, blob, offsets):
+        """
+        Args:
+            blob (numpy.ndarray): uint8 array of concatenated utf-8 strings.
+            offsets (numpy.ndarray): start of each string in blob, plus the end of the last one.
+        """
+        self._blob = blob
+        self._offsets = offsets
+
+    @staticmethod
+    def pack(strings):
+        """Pack a list of strings into (blob, offsets) arrays.
+        """
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes().decode('utf-8')
+
+    def index(self, string):
+        """Position of a string in a sorted sequence, None if not found.
+        """
+        i = bisect_left(self, string) # utf-8 bytes order is the same of python strings order
+        return i if i < len(self) and self[i] == string else None
+
+
+# files of the binary version of a nasari resource, see convert_nasari()
+MMAP_FILES = ('keys', 'key_offsets', 'key_vectors', 'lemmas', 'lemma_offsets',
+              'lemma_ids', 'scores', 'offsets', 'sorted_ids', 'ranks', 'rank_offsets')
+
+
+def convert_nasari(nasari_path, mmap_dir):
+    """One-time conversion of a nasari lexical resource (eg. the full dd-nasari.txt) into
+    a directory of binary .npy arrays, to be loaded with MmapNasari:
+
+    * keys, key_offsets: sorted keys packed as strings (see PackedStrings).
+    * key_vectors: vector index of each sorted key (last vector of repeated keys, like Nasari).
+    * lemmas, lemma_offsets: lemmas vocabulary packed as strings, lemma id is the position.
+    * lemma_ids, scores, offsets: components of all vectors (int32 lemma ids and float32 scores)
+      in file order, the components of vector i are in offsets[i]:offsets[i+1].
+    * sorted_ids, ranks, rank_offsets: sorted lemma ids and ranks of each vector (see pack_ranks()).
+
+    The input file is streamed, so only the packed arrays are kept in memory.
+
+    Args:
+        nasari_path (pathlib.Path): file of nasari lexical resource.
+        mmap_dir (pathlib.Path): output directory.
+    """
+    mmap_dir.mkdir(parents=True, exist_ok=True)
+
+    key_vectors = {}
+    lemma_vocabulary = {}
+    lemma_ids, scores, lengths = array('i'), array('f'), array('q')
+
+    with nasari_path.open('r') as file:
+        for line in file:
+            babel_synset, nasari_vector = parse_nasari_line(line)
+            key_vectors[babel_synset] = len(lengths)
+            lemma_ids.extend(lemma_vocabulary.setdefault(lemma, len(lemma_vocabulary)) for lemma, _ in nasari_vector)
+            scores.extend(score for _, score in nasari_vector)
+            lengths.append(len(nasari_vector))
+
+    keys = sorted(key_vectors)
+    arrays = {'key_vectors': np.array([key_vectors[key] for key in keys], dtype=np.int64)}
+    arrays['keys'], arrays['key_offsets'] = PackedStrings.pack(keys)
+    arrays['lemmas'], arrays['lemma_offsets'] = PackedStrings.pack(lemma_vocabulary) # dict keeps insertion (id) order
+
+    arrays['lemma_ids'] = np.frombuffer(lemma_ids, dtype=np.int32)
+    arrays['scores'] = np.frombuffer(scores, dtype=np.float32)
+    lengths = np.frombuffer(lengths, dtype=np.int64)
+    arrays['offsets'] = np.concatenate(([0], np.cumsum(lengths)))
+    arrays['sorted_ids'], arrays['ranks'], arrays['rank_offsets'] = pack_ranks(arrays['lemma_ids'], lengths)
+
+    for name in MMAP_FILES:
+        np.save(mmap_dir / (name + '.npy'), arrays[name])
+
+
+class MmapNasari():
+    """Nasari lexical resource loaded from the binary format written by convert_nasari().
+
+    Arrays are memory-mapped read-only: loading is immediate, vectors are decoded
+    lazily on lookup and the pages are shared by all the processes using the same files.
+    It offers the same API of Nasari, but scores are stored as float32.
+    """
+
+    def __init__(self, mmap_dir):
+        """
+        Args:
+            mmap_dir (pathlib.Path): directory written by convert_nasari().
+        """
+        # plain ndarray views of the memory maps, indexing np.memmap instances is much slower
+        arrays = {name: np.load(mmap_dir / (name + '.npy'), mmap_mode='r').view(np.ndarray) for name in MMAP_FILES}
+
+        self._keys = PackedStrings(arrays['keys'], arrays['key_offsets'])
+        self._lemmas = PackedStrings(arrays['lemmas'], arrays['lemma_offsets'])
+        self._key_vectors = arrays['key_vectors']
+        self._lemma_ids, self._scores, self._offsets = arrays['lemma_ids'], arrays['scores'], arrays['offsets']
+        self._sorted_ids, self._ranks, self._rank_offsets = arrays['sorted_ids'], arrays['ranks'], arrays['rank_offsets']
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return self._keys.index(key) is not None
+
+    def _vector(self, key_pos):
+        """Decode the vector of the key in position key_pos.
+        """
+        i = self._key_vectors[key_pos]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        components = [(self._lemmas[lemma_id], score)
+                      for lemma_id, score in zip(self._lemma_ids[start:end].tolist(), self._scores[start:end].tolist())]
+
+        start, end = self._rank_offsets[i], self._rank_offsets[i + 1]
+        return NasariVector(components, self._sorted_ids[start:end], self._ranks[start:end])
+
+    def get_vector(self, synset_name):
+        """Components of a nasari vector as list of tuples (lemma, score).
+        """
+        key_pos = self._keys.index(synset_name)
+        if key_pos is None:
+            raise KeyError(synset_name)
+
+        return self._vector(key_pos).components
+
+    def get_vectors(self):
+        """All the vectors as dictionary of components, note that this decodes the whole resource.
+        """
+        return {key: self._vector(key_pos).components for key_pos, key in enumerate(self._keys)}
+
+    def build_context(self, tokens):
+        """A nasari context is just a collection of lexical nasari vectors 
+           associated with a given collection of tokens.
+
+        Args:
+            tokens (iterable): a collection of tokens.
+
+        Returns:
+            list of NasariVector: a list of nasari vectors, one for each input token. 
+        """
+        key_positions = (self._keys.index(token) for token in tokens)
+        return [self._vector(key_pos) for key_pos in key_positions if key_pos is not None]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    # run from esercitazione3 directory with: python -m src.data_manager data/dd-nasari.txt data/dd-nasari
+    parser = argparse.ArgumentParser(description='Convert a nasari lexical resource to the memory-mapped binary format')
+    parser.add_argument('nasari', type=Path, help='nasari lexical resource file')
+    parser.add_argument('output', type=Path, help='output directory')
+    args = parser.parse_args()
+
+    convert_nasari(args.nasari, args.output)
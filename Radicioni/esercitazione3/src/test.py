@@ -1,10 +1,11 @@
-import text_summarization as summ
-import topic_extraction as te
-import data_manager as dm
+import src.text_summarization as summ
+import src.topic_extraction as te
+import src.data_manager as dm
 
 from pathlib import Path
 
 if __name__ == '__main__':
+    # run from esercitazione3 directory with: python -m src.test
     nasari = dm.Nasari(Path('data/dd-small-nasari-15.txt'))
     doc = dm.parse_document_sentence(Path('data/text-documents/Life-indoors.txt'))
 
@@ -1,6 +1,9 @@
+import heapq
 import math
-from itertools import product
-import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
 
 class TextSummarizer:
     """Wrapper class to summarize with a given compression ratio a textual document using 4 step extractive procedure:
@@ -18,74 +21,96 @@ class TextSummarizer:
 
     def __init__(self, main_extractor, chunk_extractor):
        """ Initialize a TextSummarizer instance with given topic extractors.
+       The instance holds no per-document state, so get_summary() can be called concurrently (eg. from a thread pool)
+       as long as the extractors can: topic_extraction extractors can, once topic_extraction.load_resources()
+       has been called on the main thread (see batch_summarization).
 
         Args:
             topic_extractors (dict): dictionary of topic_extraction.TopicExtractor instances (already initialized objects!)
        """
        self._main_topic_extractor = main_extractor
        self._chunk_topic_extractor = chunk_extractor
-       self._relevance_queue = queue.PriorityQueue()
-
 
-    def _summarize(self, document):
-        """ Method to build an internal representation of scored body chunks.
-        To keep track of score ordering the class use a priority queue.
-        The priority queue contains triples:
 
-        (avg. relevance score, chunk order in the original text, textual content of the chunk)
+    def score_chunks(self, document):
+        """ Score every body chunk of a document with its average weighted overlap (WO) relevance
+        between all possible pairs of title vectors and chunk vectors.
 
         body_chunk is some textual unit (ie sentence or paragraph), which coarseness level depends on the 
         actual document instance given as input. 
-        
-        The core operation is the computation of average weighted overlap (WO) relevance 
-        between all possible pairs of title vectors and chunk vectors.
 
-        This is an internal method to build the priority queue. To get the actual summarized text
-        the "public" version get_summary() must be used.
+        Topic vectors of all chunks are stacked, so the WO of the whole title x body product is
+        computed in a single pass, then averaged chunk by chunk.
 
         Args:
             document (data_manager.Document): parsed textual document to summarize
+
+        Returns:
+            numpy.ndarray: avg. relevance score of each chunk, in the original text order.
         """
-        # extract title topic
-        title_topic = self._main_topic_extractor.get_topic(document)
+        return topic_relevance(*self._topics(document))
 
-        for chunk_num, body_chunk in enumerate(document.body, start=1):
-            chunk_topic = self._chunk_topic_extractor.get_topic(body_chunk)  # extract chunk topic
-            
-            # use itertools.product to compute pair-wise cartesian product of nasari vectors between title and chunk
-            relevance_scores = [self.weighted_overlap(v1,v2) for v1, v2 in product(title_topic, chunk_topic)]
-            
-            avg_relevance = sum(relevance_scores) / len(relevance_scores) if len(relevance_scores) > 0 else 0.0
+    def _topics(self, document):
+        """ Title topic and topic of each body chunk of a document.
+        """
+        title_topic = self._main_topic_extractor.get_topic(document) # extract title topic
+        chunk_topics = [self._chunk_topic_extractor.get_topic(body_chunk) for body_chunk in document.body] # extract chunk topics
 
-            self._relevance_queue.put((-avg_relevance, chunk_num, body_chunk )) # -avg score since queue is a min heap
+        return title_topic, chunk_topics
 
-    def get_summary(self, document, compression_ratio=10, debug=False):
+    def get_summary(self, document, compression_ratio=10, debug=False, mmr_lambda=None, workers=None):
         """ Get a summarized version of the original document with a given compression ratio.
         Higher the compression ration shorter will be the summary.
-        
+
+        By default chunks are ranked only by relevance, so near-duplicate chunks are both selected.
+        With mmr_lambda chunks are selected with Maximal Marginal Relevance (MMR), balancing relevance
+        against redundancy with the chunks already selected, see mmr_selection().
         
         Args:
             document (data_manager.Document): parsed textual document to summarize
             compression_ratio (int, optional): percentual strength of compression. Defaults to 10.
+            mmr_lambda (float, optional): MMR trade-off between relevance (1.0) and redundancy (0.0). Defaults to None (relevance only).
+            workers (int, optional): threads used to compute chunks similarity in MMR mode. Defaults to None (ThreadPoolExecutor default).
 
         Returns:
             str:  
         """
-        
-        # compute chunks to retain/discard wrt the given compression ratio
-        cutoff = int(round((compression_ratio / 100) * len(document.body)))
-        to_keep = len(document.body) - cutoff
+        if mmr_lambda is None:
+            return self.summary_from_scores(document, self.score_chunks(document), compression_ratio, debug)
 
-        self._summarize(document) # build priority queue
+        title_topic, chunk_topics = self._topics(document)
+        relevance = topic_relevance(title_topic, chunk_topics)
+        similarity = chunk_similarity_matrix(chunk_topics, workers=workers)
+
+        selected = mmr_selection(relevance, similarity, self._to_keep(document, compression_ratio), mmr_lambda)
+        selected_chunks = [(relevance[i], i + 1, document.body[i]) for i in selected]
+
+        return self._format_summary(selected_chunks, debug)
+
+    def summary_from_scores(self, document, relevance, compression_ratio=10, debug=False):
+        """ Same as get_summary() but with chunks already scored by score_chunks(), eg. to summarize
+        the same document with many compression ratios.
+
+        Args:
+            document (data_manager.Document): parsed textual document to summarize
+            relevance (numpy.ndarray): avg. relevance score of each chunk.
+            compression_ratio (int, optional): percentual strength of compression. Defaults to 10.
+
+        Returns:
+            str:  
+        """
+        # most relevant chunks, ties are broken by chunk order in the original text
+        selected = heapq.nlargest(self._to_keep(document, compression_ratio), range(len(relevance)), key=lambda i: (relevance[i], -i))
+        selected_chunks = [(relevance[i], i + 1, document.body[i]) for i in selected]
 
-        selected_chunks = []
-        for i in range(to_keep): # just get a to_keep number of chunks
-            selected_chunks.append(self._relevance_queue.get())
-        
-        self._relevance_queue.queue.clear() # empty the queue for further processing
-        
         return self._format_summary(selected_chunks, debug)
 
+    def _to_keep(self, document, compression_ratio):
+        """ Number of chunks to retain wrt the given compression ratio.
+        """
+        cutoff = int(round((compression_ratio / 100) * len(document.body)))
+        return len(document.body) - cutoff
+
     def _format_summary(self, selected_chunks, debug=False):
         """Format selected chunks into a string
 
@@ -97,53 +122,212 @@ class TextSummarizer:
             str: formatted textual representation of the summary. 
         """
         format_string = '{} [{:.3f};{}]' if debug else '{}'
-        formatted_chunks = [format_string.format(chunk, -relevance, chunk_num) for relevance, chunk_num, chunk in selected_chunks] # -relevance since is inverted in te queue
+        formatted_chunks = [format_string.format(chunk, relevance, chunk_num) for relevance, chunk_num, chunk in selected_chunks]
         
         return '\n'.join(formatted_chunks) # join chunks in multi-line string
 
 
     def weighted_overlap(self, v1, v2):
-        """ Weighted Overlap (WO) similarity measure by Pilehvar et al. (2013)
-
-        Args:
-            v1 (data_manager.Nasari vector): list of tuples (lemma, score)
-            v2 (data_manager.Nasari vector): list of tuples (lemma, score)
+        """ Weighted Overlap (WO) similarity measure by Pilehvar et al. (2013), see weighted_overlap().
         """
+        return weighted_overlap(v1, v2)
 
-        # project only lemmas
-        v1_components = set([elem[0] for elem in v1]) 
-        v2_components = set([elem[0] for elem in v2])
 
-        # components shared by both vectors
-        overlapped_components = v1_components.intersection(v2_components) 
-        
-        wo = 0
-        if len(overlapped_components) > 0:
-            num = sum([1.0/(self._rank(q,v1) + self._rank(q,v2)) for q in overlapped_components])
-            den = sum([1.0/(2*(i+1)) for i,_ in enumerate(overlapped_components)])
-            wo = num / den
-        
-        return math.sqrt(wo) # squared root as suggested by Navigli et al.
+def topic_relevance(title_topic, chunk_topics):
+    """ Average weighted overlap (WO) relevance of each chunk topic wrt the title topic, ie.
+    the average WO between all possible pairs of title vectors and chunk vectors.
 
-    
-    def _rank(self, component, vector):
-        """ Compute the rank of a nasari vector component, ie the position of the component (lemma) 
-        in the ranking created by descending scores values"
-        Args:
-            component (str): [description]
-            vector (data_manager.Nasari vector): list of tuples (lemma, score)
+    Topic vectors of all chunks are stacked, so the WO of the whole title x body product is
+    computed in a single pass, then averaged chunk by chunk.
 
-        Returns:
-            int: rank of the component
-        """
+    Args:
+        title_topic (list of data_manager.NasariVector): title topic.
+        chunk_topics (list of list of data_manager.NasariVector): topic of each chunk.
 
-        # make sure that lemmas as ordered by score
-        ranking = sorted(vector, key=lambda v: v[1], reverse=True) # descending order by score
-        
-        rank_pos= 0
-        for pos, (lemma, score) in enumerate(vector, start=1):
-            if lemma == component:
-                rank_pos= pos
-                break
-        
-        return rank_pos
\ No newline at end of file
+    Returns:
+        numpy.ndarray: avg. relevance score of each chunk.
+    """
+    # pair-wise WO between all title and chunks nasari vectors
+    relevance_scores = weighted_overlap_matrix(title_topic, [v for chunk_topic in chunk_topics for v in chunk_topic])
+
+    relevance = np.zeros(len(chunk_topics))
+    start = 0
+    for i, chunk_topic in enumerate(chunk_topics):
+        chunk_scores = relevance_scores[:, start:start + len(chunk_topic)]
+        if chunk_scores.size > 0:
+            relevance[i] = sum(chunk_scores.flat) / chunk_scores.size
+        start += len(chunk_topic)
+
+    return relevance
+
+
+def chunk_similarity_matrix(chunk_topics, block_size=256, workers=None):
+    """ Similarity between all pairs of chunks, ie. the average WO between all pairs of their topic vectors.
+
+    The WO matrix M of the distinct vectors of all topics is computed once (see weighted_overlap_blocks()),
+    then with the sparse (chunks x vectors) counts matrix A the similarity is A M A^T / (len_i * len_j).
+
+    Args:
+        chunk_topics (list of list of data_manager.NasariVector): topic of each chunk.
+        block_size (int, optional): rows of each block of the WO matrix. Defaults to 256.
+        workers (int, optional): number of threads computing the blocks. Defaults to None (ThreadPoolExecutor default).
+
+    Returns:
+        numpy.ndarray: len(chunk_topics) x len(chunk_topics) similarity matrix, 0 for chunks without topic.
+    """
+    vector_idx = {} # id of distinct vector objects -> column of A
+    vectors, rows, cols = [], [], []
+    for row, chunk_topic in enumerate(chunk_topics):
+        for v in chunk_topic:
+            if id(v) not in vector_idx:
+                vector_idx[id(v)] = len(vectors)
+                vectors.append(v)
+            rows.append(row)
+            cols.append(vector_idx[id(v)])
+
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(chunk_topics), len(vectors)))
+    wo = weighted_overlap_blocks(vectors, block_size, workers)
+
+    lengths = np.array([len(chunk_topic) for chunk_topic in chunk_topics], dtype=float)
+    similarity = np.asarray((counts @ (counts @ wo).T).T) # A M A^T, M is symmetric
+    norm = np.outer(lengths, lengths)
+
+    return np.divide(similarity, norm, where=norm > 0, out=np.zeros_like(similarity))
+
+
+def weighted_overlap_blocks(vectors, block_size=256, workers=None):
+    """ Symmetric WO matrix of a collection of nasari vectors. Only the upper triangle
+    is computed, in row blocks processed by a pool of threads.
+
+    Args:
+        vectors (list of data_manager.NasariVector): nasari vectors
+        block_size (int, optional): rows of each block. Defaults to 256.
+        workers (int, optional): number of threads. Defaults to None (ThreadPoolExecutor default).
+
+    Returns:
+        numpy.ndarray: len(vectors) x len(vectors) matrix of WO similarities.
+    """
+    n = len(vectors)
+    wo = np.zeros((n, n))
+
+    def fill_block(start):
+        end = min(start + block_size, n)
+        block = weighted_overlap_matrix(vectors[start:end], vectors[start:])
+        wo[start:end, start:] = block
+        wo[start:, start:end] = block.T
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fill_block, range(0, n, block_size)))
+
+    return wo
+
+
+def mmr_selection(relevance, similarity, k, mmr_lambda=0.7):
+    """ Greedy Maximal Marginal Relevance (MMR) selection by Carbonell and Goldstein (1998):
+    at each step select the chunk maximizing
+
+        mmr_lambda * relevance[i] - (1 - mmr_lambda) * max(similarity[i, j] for j already selected)
+
+    Ties are broken by chunk order in the original text.
+
+    Args:
+        relevance (numpy.ndarray): relevance of each chunk.
+        similarity (numpy.ndarray): chunk x chunk similarity matrix.
+        k (int): number of chunks to select.
+        mmr_lambda (float, optional): trade-off between relevance (1.0) and redundancy (0.0). Defaults to 0.7.
+
+    Returns:
+        list of int: indexes of selected chunks, in selection order.
+    """
+    redundancy = np.zeros(len(relevance)) # max similarity with the selected chunks
+    available = np.ones(len(relevance), dtype=bool)
+
+    selected = []
+    for _ in range(min(k, len(relevance))):
+        mmr = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+
+    return selected
+
+
+def _overlap_normalization(max_overlap):
+    """ WO denominators for every possible number n of overlapped components,
+    ie. sum(1 / 2i) for i in 1..n, with n in 0..max_overlap.
+    """
+    return np.concatenate(([0.0], np.cumsum(1.0 / (2 * np.arange(1, max_overlap + 1)))))
+
+
+def weighted_overlap(v1, v2):
+    """ Weighted Overlap (WO) similarity measure by Pilehvar et al. (2013)
+
+    Args:
+        v1 (data_manager.NasariVector): nasari vector
+        v2 (data_manager.NasariVector): nasari vector
+
+    Returns:
+        float: square root of the weighted overlap.
+    """
+    ranks1, ranks2 = v1.ranks_by_lemma, v2.ranks_by_lemma
+
+    # components shared by both vectors
+    overlapped_components = ranks1.keys() & ranks2.keys()
+
+    wo = 0
+    if len(overlapped_components) > 0:
+        num = sum([1.0/(ranks1[q] + ranks2[q]) for q in overlapped_components])
+        den = _overlap_normalization(len(overlapped_components))[-1]
+        wo = num / den
+
+    return math.sqrt(wo) # squared root as suggested by Navigli et al.
+
+
+def weighted_overlap_matrix(vectors1, vectors2):
+    """ Weighted Overlap (WO) between all pairs of two collections of nasari vectors,
+    eg. the title topic and a chunk topic.
+
+    Shared components of all pairs are found at once joining the sorted lemma ids of
+    the two collections, then rank contributions are summed for each pair.
+
+    Args:
+        vectors1 (list of data_manager.NasariVector): nasari vectors
+        vectors2 (list of data_manager.NasariVector): nasari vectors
+
+    Returns:
+        numpy.ndarray: len(vectors1) x len(vectors2) matrix of WO similarities.
+    """
+    n1, n2 = len(vectors1), len(vectors2)
+    if n1 == 0 or n2 == 0:
+        return np.zeros((n1, n2))
+
+    ids1, rows, ranks1 = _stack_components(vectors1)
+    ids2, cols, ranks2 = _stack_components(vectors2)
+
+    # sort the second collection by lemma id, then find the matching range of each component of the first one
+    order = np.argsort(ids2, kind='stable')
+    ids2, cols, ranks2 = ids2[order], cols[order], ranks2[order]
+    lo = np.searchsorted(ids2, ids1, side='left')
+    counts = np.searchsorted(ids2, ids1, side='right') - lo
+
+    # expand each match into a (row, col, rank1, rank2) tuple
+    matches = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    pairs = np.repeat(rows, counts) * n2 + cols[matches]
+    contributions = 1.0 / (np.repeat(ranks1, counts) + ranks2[matches])
+
+    num = np.bincount(pairs, weights=contributions, minlength=n1 * n2)
+    n_overlaps = np.bincount(pairs, minlength=n1 * n2)
+    normalization = _overlap_normalization(n_overlaps.max())
+
+    wo = np.divide(num, normalization[n_overlaps], where=n_overlaps > 0, out=np.zeros(n1 * n2))
+    return np.sqrt(wo).reshape(n1, n2) # squared root as suggested by Navigli et al.
+
+
+def _stack_components(vectors):
+    """ Lemma ids, vector index and rank of all the components of a collection of nasari vectors.
+    """
+    lengths = [len(v.lemma_ids) for v in vectors]
+    return (np.concatenate([v.lemma_ids for v in vectors]),
+            np.repeat(np.arange(len(vectors)), lengths),
+            np.concatenate([v.ranks for v in vectors]))
@@ -1,25 +1,76 @@
+import hashlib
+
 import nltk
-from nltk.corpus import stopwords
-from pathlib import Path
 
-STOP_WORDS = set(Path('data/stop_words_FULL.txt').open('r').read().splitlines())
+import tln_common.cache as lru
+import tln_common.resources as res
+import tln_common.text_pipeline as tp
+
+
+class TopicCache(lru.LRUCache):
+    """Bounded LRU cache of the bag of word of text chunks, keyed by the hash of the chunk content,
+    with optional on-disk persistence (see tln_common.cache).
+
+    Revisions of a document share most of their chunks, so only the changed ones need to be tokenized again.
+    The cache stores tokens instead of Nasari vectors: building a context from tokens is a cheap
+    lookup, while tokenization and lemmatization are the expensive steps. The cache can be shared
+    by the threads of a process, eg. the workers of batch_summarization.
+    """
+
+    def __init__(self, maxsize=100000, path=None):
+        """
+        Args:
+            maxsize (int, optional): max number of cached chunks. Defaults to 100000.
+            path (pathlib.Path, optional): file where the cache is persisted, loaded if it already exists. Defaults to None.
+        """
+        super().__init__(maxsize, path)
+
+    @staticmethod
+    def key(text):
+        """Content hash of a text chunk.
+        """
+        return hashlib.sha1(text.encode('utf-8')).digest()
+
+    def get(self, text, build_tokens):
+        """Get the tokens of a text chunk, building and caching them on a cache miss.
+
+        Args:
+            text (str): text chunk.
+            build_tokens (callable): function that build the tokens of a text.
+
+        Returns:
+            frozenset of str: tokens of the text.
+        """
+        return super().get(self.key(text), lambda: frozenset(build_tokens(text)))
+
 
 class TopicExtractor():
     """Extract a topic from some text usign some method. The topic is a collection of nasari vectors.
     """
-    def __init__(self, nasari):
+    def __init__(self, nasari, cache=None):
+        """
+        Args:
+            nasari (data_manager.Nasari): nasari lexical resource.
+            cache (TopicCache, optional): cache of chunk tokens, could be shared among extractors. Defaults to None (no cache).
+        """
         self._nasari = nasari
-    
+        self._cache = cache
+
+    def _tokens(self, text):
+        if self._cache is None:
+            return bow_model(text, stopwords=res.load_stop_words())
+        return self._cache.get(text, lambda text: bow_model(text, stopwords=res.load_stop_words()))
+
     def get_topic(self, text):
-        title_tokens = bow_model(text, stopwords=STOP_WORDS)
+        title_tokens = self._tokens(text)
         context_vectors = self._nasari.build_context(title_tokens)
         
         return context_vectors
 
 class TitleExtractor(TopicExtractor):
 
-    def __init__(self, lexical_resource):
-        super().__init__(lexical_resource)
+    def __init__(self, lexical_resource, cache=None):
+        super().__init__(lexical_resource, cache)
 
     def get_topic(self, document):
         """[summary]
@@ -34,6 +85,11 @@ class TitleExtractor(TopicExtractor):
         return super().get_topic(document.title)
 
 
+# shared by all bag of word models of the module
+_PIPELINE = tp.TextPipeline(punctuation={'.',',', ';', '(', ')', '{', '}', 
+                                         '[', ']', "’", '‘',  '“', '”',':', '?', '!'},
+                            lowercase=True, sentence_split=True, lemmatize=True)
+
 def bow_model(text, stopwords=None):
     """Build a bag of word (BOW) model for a given sentence, 
     removing puntcuation marks and optionally stopwords. 
@@ -45,18 +101,12 @@ def bow_model(text, stopwords=None):
     Returns:
         set: bag of word.
     """
-    bow = set()
-    punct = {'.',',', ';', '(', ')', '{', '}', 
-             '[', ']', "’", '‘',  '“', '”',':', '?', '!'} 
-    lemmatizer = nltk.WordNetLemmatizer()
-
-    for sentence in nltk.sent_tokenize(text): # sentence granularity tokenization
-        sentence = sentence.lower()
-        sentence_bow = set(nltk.word_tokenize(sentence)) # word granularity tokenization
-        sentence_bow = sentence_bow.difference(punct)
+    return _PIPELINE.bow(text, stopwords)
 
-        if stopwords:
-            sentence_bow = sentence_bow.difference(stopwords)
-        bow.update(sentence_bow)
 
-    return set(lemmatizer.lemmatize(token) for token in bow) # lemmatization
+def load_resources():
+    """Load the stop words and the NLTK resources used by bow_model(). NLTK lazy loaders are not
+    thread-safe, so call it on the main thread before extracting topics from many threads.
+    """
+    res.load_stop_words()
+    _PIPELINE.load_resources()
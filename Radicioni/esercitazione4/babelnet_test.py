@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import src.data_manager as dm
+import src.fake_babelnet as fb
+
+"""
+script to check that data_manager.BabelNet stops spending babel coins as soon as the API answers
+with an error (eg. daily limit reached) in the middle of a batch of requests.
+
+A local fake BabelNet server answers the first LIMIT requests and then the daily limit error:
+get_synsets_lemmas() must raise the error and the queued synsets must never be requested.
+The script must be executed from the esercitazione4 directory:
+
+    python babelnet_test.py
+"""
+
+LIMIT = 5
+WORKERS = 2
+
+if __name__ == '__main__':
+    server = fb.serve(Path('data/senses_annotations.tsv'), latency=0.05, limit=LIMIT)
+    babelIds = sorted(server.synsets)
+    babelnet = dm.BabelNet('fake', endpoint_url=server.url, max_workers=WORKERS, rate=1000)
+
+    try:
+        babelnet.get_synsets_lemmas(babelIds)
+        raise AssertionError('the daily limit error was not raised')
+    except RuntimeError as e:
+        print("raised: {}".format(e))
+    finally:
+        babelnet.close()
+        server.shutdown()
+
+    requested = set(server.requested_ids)
+    pending = [babelId for babelId in babelIds if babelId not in requested]
+    print("{} synsets, {} requested, {} never requested".format(len(babelIds), len(requested), len(pending)))
+
+    # besides the failed one, only the requests already in flight can be sent
+    assert server.requests <= LIMIT + WORKERS, server.requests
+    assert pending == babelIds[server.requests:], 'queued synsets were requested'
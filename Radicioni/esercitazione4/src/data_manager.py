@@ -3,8 +3,18 @@ from pathlib import Path
 from collections import namedtuple
 import nltk
 import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 class LemmaToSensesMapper():
     """ interface that represent a 1-to-n mapping between a given lemma and associated senses.
@@ -17,6 +27,8 @@ class LemmaToSensesMapper():
     where:
         key should be a lemma
         list of senses: a list of some representation for the senses (vectors, synset Id, etc.)
+
+    Subclasses may store the mapping in a different layout (see SemEval), get_synsetsID() is the access method.
     """
     
     def __init__(self) -> None:
@@ -44,18 +56,94 @@ class SemEval(LemmaToSensesMapper):
     bn:15363387n
     bn:00067098n
     bn:00044080n
+
+    The inventory is stored in compact arrays: babel IDs are interned as integer sense ids, the senses 
+    of all lemmas are a single CSR-style array (senses of lemma i are senses[offsets[i]:offsets[i + 1]], 
+    in file order without duplicates) and a reverse index with the same layout maps each sense to its lemmas.
     """
         
     def __init__(self, semeval_path) -> None:
-        super().__init__()
+        super().__init__() # _lemmas is left empty, the mapping is stored in the compact arrays below
+
+        self._lemma_block = {} # lemma -> lemma index (block of its senses)
+        self._babelIDs = [] # sense id -> babel synset ID
+        self._sense_ids = {} # babel synset ID -> sense id
+        self._lemma_names = [] # lemma index -> lemma
+        senses = []
+        offsets = [0]
 
         with semeval_path.open('r') as file:
-            blocks = file.read().split('#') # (word, [synsets]) are delimited by # char
-            for lemma_block in blocks[1:]: # first element is always an empty string
-                lines = lemma_block.splitlines()
-                synset_word = lines[0] # first line is the lemma, the remaining ones are babel IDs
-        
-                self._lemmas[synset_word] = set(lines[1:]) # babel synsets IDs
+            lemma_senses = None
+            for line in file:
+                line = line.rstrip('\n')
+                if line.startswith('#'): # (word, [synsets]) are delimited by # char
+                    if lemma_senses is not None:
+                        senses.extend(lemma_senses)
+                        offsets.append(len(senses))
+                    self._lemma_block[line[1:]] = len(self._lemma_names) # repeated lemmas keep the last block, like a dict
+                    self._lemma_names.append(line[1:])
+                    lemma_senses = {}
+                elif line and lemma_senses is not None:
+                    lemma_senses.setdefault(self._intern(line)) # dict keeps file order and drops duplicates
+
+            if lemma_senses is not None:
+                senses.extend(lemma_senses)
+                offsets.append(len(senses))
+
+        self._senses = np.array(senses, dtype=np.int32)
+        self._offsets = np.array(offsets, dtype=np.int64)
+
+        # reverse index: lemmas of each sense, sorted by sense id (stable, so lemmas keep file order)
+        lemma_of_sense = np.repeat(np.arange(len(self._lemma_names), dtype=np.int32), np.diff(self._offsets))
+        order = np.argsort(self._senses, kind='stable')
+        self._sense_lemmas = lemma_of_sense[order]
+        self._sense_offsets = np.searchsorted(self._senses[order], np.arange(len(self._babelIDs) + 1)).astype(np.int64)
+
+    def _intern(self, babelID):
+        """ Integer sense id of a babel synset ID, a new one if the ID was never seen.
+        """
+        sense_id = self._sense_ids.get(babelID)
+        if sense_id is None:
+            sense_id = self._sense_ids[babelID] = len(self._babelIDs)
+            self._babelIDs.append(babelID)
+        return sense_id
+
+    def __len__(self):
+        return len(self._lemma_block)
+
+    def __contains__(self, lemma):
+        return lemma in self._lemma_block
+
+    @property
+    def n_senses(self):
+        """int: number of distinct babel senses.
+        """
+        return len(self._babelIDs)
+
+    def get_sense_ids(self, lemma):
+        """ Integer sense ids of a given lemma, in file order.
+
+        Args:
+            lemma (str): lemma (word)
+
+        Raises:
+            KeyError: if the lemma is not in SemEval.
+
+        Returns:
+            numpy.ndarray: int32 sense ids (a read-only view, don't modify it).
+        """
+        i = self._lemma_block[lemma]
+        return self._senses[self._offsets[i]:self._offsets[i + 1]]
+
+    def get_babelID(self, sense_id):
+        """ Babel synset ID of an integer sense id.
+        """
+        return self._babelIDs[sense_id]
+
+    def get_sense_id(self, babelID):
+        """ Integer sense id of a babel synset ID, None if the sense is not in SemEval.
+        """
+        return self._sense_ids.get(babelID)
 
     def get_synsetsID(self, lemma):
         """ Get a list of associated babel senses with a given lemma 
@@ -64,9 +152,104 @@ class SemEval(LemmaToSensesMapper):
             lemma (str): lemma (word)
 
         Returns:
-            [list of str]: list of babel synset IDs
+            [list of str]: list of babel synset IDs, in file order without duplicates
+        """
+        return [self._babelIDs[sense_id] for sense_id in self.get_sense_ids(lemma).tolist()]
+
+    def get_sense_lemmas(self, babelID):
+        """ Get all the lemmas associated with a given babel sense.
+
+        Args:
+            babelID (str): babel synset ID
+
+        Returns:
+            [list of str]: lemmas in file order, empty if the sense is not in SemEval
+        """
+        sense_id = self._sense_ids.get(babelID)
+        if sense_id is None:
+            return []
+        lemmas = self._sense_lemmas[self._sense_offsets[sense_id]:self._sense_offsets[sense_id + 1]]
+        return [self._lemma_names[i] for i in lemmas.tolist()]
+
+    def get_related_lemmas(self, lemma):
+        """ Get the other lemmas sharing at least one sense with a given lemma.
+
+        Args:
+            lemma (str): lemma (word)
+
+        Returns:
+            [list of str]: lemmas in file order
         """
-        return self._lemmas[lemma]
+        sense_ids = self.get_sense_ids(lemma)
+        if not len(sense_ids):
+            return []
+        starts, ends = self._sense_offsets[sense_ids], self._sense_offsets[sense_ids + 1]
+
+        # lemmas of all the senses, gathered at once from their ranges in the reverse index
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        related = np.unique(self._sense_lemmas[positions])
+        return [self._lemma_names[i] for i in related.tolist() if self._lemma_names[i] != lemma]
+
+    def nasari_rows(self, nasari):
+        """ Row of the vector of each sense in a nasari matrix.
+
+        Args:
+            nasari (Nasari): nasari embedded resource.
+
+        Returns:
+            numpy.ndarray: int64 array indexed by sense id, -1 for senses that are not in nasari.
+        """
+        rows = [nasari.get_row(babelID) for babelID in self._babelIDs]
+        return np.array([row if row is not None else -1 for row in rows], dtype=np.int64)
+
+QUANTIZATIONS = {'int8': (np.int8, 127.0), 'float16': (np.float16, 1.0)} # storage dtype and max quantized value
+
+
+def quantize(matrix, quantization, block_size=65536):
+    """Quantize a matrix with a scale factor for each row: each row is divided by its max absolute value
+    and multiplied by the max quantized value, so it fills the range of the storage dtype.
+
+    Args:
+        matrix (numpy.ndarray): (rows x dimensions) float matrix.
+        quantization (str): 'int8' or 'float16'.
+        block_size (int, optional): rows quantized at once, to bound memory. Defaults to 65536.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): quantized matrix and float32 scale of each row (row ~= quantized row * scale).
+    """
+    dtype, max_value = QUANTIZATIONS[quantization]
+    quantized = np.empty(matrix.shape, dtype=dtype)
+    scales = np.ones(len(matrix), dtype=np.float32)
+
+    for start in range(0, len(matrix) if matrix.shape[1] else 0, block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        block_scales = np.abs(block).max(axis=1) / max_value
+        block_scales[block_scales == 0] = 1.0 # zero vectors
+        values = block / block_scales[:, None]
+        quantized[start:start + block_size] = np.rint(values) if np.issubdtype(dtype, np.integer) else values
+        scales[start:start + block_size] = block_scales
+
+    return quantized, scales
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file in the same directory, renamed to path only when complete:
+    concurrent readers (eg. other processes loading the same cache) never see a partially written file.
+
+    Args:
+        path (pathlib.Path): destination file.
+        write (callable): function writing the content to the given binary file object.
+    """
+    tmp_path = path.with_name('{}.{}.tmp'.format(path.name, os.getpid()))
+    try:
+        with tmp_path.open('wb') as file:
+            write(file)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists(): # write failed
+            tmp_path.unlink()
+
 
 class Nasari():
     """ Class to load and access Nasari embedded version.
@@ -74,30 +257,226 @@ class Nasari():
         Each lemma in nasari have one or more vector. Each vector is obtained from an embedding procedure 
         and so is a numerical vector.
 
+        All vectors are stored as rows of a single contiguous float32 matrix, indexed by babel synset id.
+        The parsed matrix is cached as .npy file next to the tsv file (with a .ids.tsv file of row ids), 
+        so subsequent loads just memory-map it. The matrix is read-only, whether parsed or memory-mapped.
 
+        To save memory (eg. many worker processes) the matrix can be stored quantized to int8 or float16 
+        (4x and 2x smaller) with a scale factor for each vector. Cosine similarity is computed directly on 
+        the quantized values, since it doesn't depend on the scales.
     """
 
-    def __init__(self, nasari_path, mapper=None):
+    def __init__(self, nasari_path, mapper=None, cache=True, quantization=None):
         """Build a nasari instance with an optional LemmaToSensesMapper instance.
 
         Args:
             nasari_path (pathlib.Path): [description]
             mapper (LemmaToSensesMapper, optional): a LemmaToSensesMapper istance . Defaults to None.
+            cache (bool, optional): load/save the parsed matrix from/to the .npy cache. Defaults to True.
+            quantization (str, optional): 'int8' or 'float16' to store the matrix quantized, with a scale factor for each vector
+                (the quantized matrix is cached too). Defaults to None (float32 matrix).
         """
-        self._nasari = {}
-        self._nasari_words = {}
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError('Unknown quantization {}, use one of {}'.format(quantization, list(QUANTIZATIONS)))
+
         self._mapper = mapper
+        self._sense_rows = None # row of each SemEval sense id, built on first lemma lookup
+        self._quantization = quantization
+        self._scales = None # scale factor of each vector of a quantized matrix
+
+        matrix_path, ids_path = self.cache_paths(nasari_path)
+        quantized_paths = self.quantized_cache_paths(nasari_path, quantization) if quantization else None
+
+        cached = self._load_cache(nasari_path, ids_path, *quantized_paths) if cache and quantized_paths else None
+        if cached is not None:
+            (self._matrix, self._scales), rows = cached
+        else:
+            cached = self._load_cache(nasari_path, ids_path, matrix_path) if cache else None
+            if cached is not None:
+                (self._matrix,), rows = cached
+            else:
+                self._matrix, rows = self._parse(nasari_path)
+                self._matrix.setflags(write=False) # like the memory-mapped matrix
+                if cache:
+                    self._save_cache([(matrix_path, self._matrix)], ids_path, rows)
+
+            if quantization:
+                self._matrix, self._scales = quantize(self._matrix, quantization)
+                self._matrix.setflags(write=False)
+                self._scales.setflags(write=False)
+                if cache:
+                    self._save_cache(list(zip(quantized_paths, (self._matrix, self._scales))))
+
+        self._rows = {babelID: row for row, (babelID, _) in enumerate(rows)} # repeated ids keep the last row, like a dict
+        self._synsetIDs = [babelID for babelID, _ in rows]
+        # L2 norms (in float64) computed once, to normalize vectors for cosine similarity.
+        # Cosine is scale invariant, so vectors of a quantized matrix are normalized without their scales
+        self._norms = np.sqrt(np.einsum('ij,ij->i', self._matrix, self._matrix, dtype=np.float64))
+        self._nasari_words = {babelID: synset_word for babelID, synset_word in rows}
+
+    @staticmethod
+    def _cache_valid(nasari_path, *cache_paths):
+        """Cache files exist and are not older than the nasari tsv file.
+        """
+        return (all(path.exists() for path in cache_paths) and 
+                min(path.stat().st_mtime for path in cache_paths) >= nasari_path.stat().st_mtime)
+
+    @staticmethod
+    def _read_ids(ids_path):
+        with ids_path.open('r') as file:
+            return [line.rstrip('\n').split('\t') for line in file]
+
+    @classmethod
+    def _load_cache(cls, nasari_path, ids_path, *arrays_paths):
+        """Load cached arrays, memory-mapped as read-only plain ndarray views, and row ids.
+
+        Returns:
+            (list of numpy.ndarray, list of (str, str)): arrays and row ids, None if the cache is missing, stale or unreadable.
+        """
+        if not cls._cache_valid(nasari_path, ids_path, *arrays_paths):
+            return None
+        try:
+            return [np.load(path, mmap_mode='r').view(np.ndarray) for path in arrays_paths], cls._read_ids(ids_path)
+        except (OSError, ValueError): # eg. truncated or corrupted file
+            return None
+
+    @staticmethod
+    def _save_cache(arrays, ids_path=None, rows=None):
+        """Save cache files, each one replaced atomically. A cache that can't be saved (eg. read-only directory)
+        is skipped with a warning, the next load just parses the tsv file again.
+
+        Args:
+            arrays (list of (pathlib.Path, numpy.ndarray)): arrays to save as .npy files.
+            ids_path (pathlib.Path, optional): file of row ids. Defaults to None (row ids not saved).
+            rows (list of (str, str), optional): (babel synset id, word) of each row. Defaults to None.
+        """
+        try:
+            for path, array in arrays:
+                _write_atomic(path, lambda file: np.save(file, array))
+            if ids_path is not None: # written last, so the cache is valid only when all files are
+                _write_atomic(ids_path, lambda file: file.writelines(
+                              '{}\t{}\n'.format(babelID, synset_word).encode('utf-8') for babelID, synset_word in rows))
+        except OSError as e:
+            warnings.warn('Nasari cache not saved: {}'.format(e))
+
+    @staticmethod
+    def cache_paths(nasari_path):
+        """Paths of the cached matrix (.npy) and of its row ids (.ids.tsv) for a nasari tsv file.
+        """
+        return (nasari_path.with_suffix('.npy'), 
+                nasari_path.with_name(nasari_path.stem + '.ids.tsv'))
+
+    @staticmethod
+    def quantized_cache_paths(nasari_path, quantization):
+        """Paths of the cached quantized matrix and of its scales (.npy files) for a nasari tsv file.
+        """
+        return (nasari_path.with_name('{}.{}.npy'.format(nasari_path.stem, quantization)), 
+                nasari_path.with_name('{}.{}.scales.npy'.format(nasari_path.stem, quantization)))
+
+    @staticmethod
+    def _parse(nasari_path):
+        """Parse the nasari tsv file.
+
+        Returns:
+            (numpy.ndarray, list of (str, str)): float32 matrix of vectors and (babel synset id, word) of each row.
+        """
+        vectors = []
+        rows = []
 
         with nasari_path.open('r') as file:
             tsv_reader = csv.reader(file, delimiter='\t') # for tsv files
             
             for row in tsv_reader:
                 babelID, synset_word = row[0].split('__') # first element is always synsetID__word
-                vector = np.array(row[1:]).astype('float')
-                        
-                self._nasari[babelID] = vector # build dictionary for each row of the file
-                self._nasari_words[babelID] = synset_word
+                vectors.append(np.array(row[1:], dtype=np.float32))
+                rows.append((babelID, synset_word))
+
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return matrix, rows
+
+    @property
+    def matrix(self):
+        """numpy.ndarray: (synsets x dimensions) matrix of all the vectors, as stored: float32 or quantized values 
+        (without scales, see vectors()).
+        """
+        return self._matrix
+
+    @property
+    def quantization(self):
+        """str: quantization of the stored matrix, None if it is float32.
+        """
+        return self._quantization
+
+    @property
+    def nbytes(self):
+        """int: memory size of the stored matrix (and of its scales).
+        """
+        return self._matrix.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    @property
+    def norms(self):
+        """numpy.ndarray: float64 L2 norm of each vector of the stored matrix (without scales, see unit_vectors()).
+        """
+        return self._norms
 
+    def vectors(self, rows):
+        """ float64 vectors of the given rows of the matrix, dequantized if the matrix is quantized.
+
+        Args:
+            rows (numpy.ndarray): rows of the matrix.
+
+        Returns:
+            numpy.ndarray: (len(rows) x dimensions) matrix of vectors.
+        """
+        vectors = self._matrix[rows].astype(np.float64)
+        if self._scales is not None:
+            vectors *= self._scales[rows, None]
+        return vectors
+
+    def unit_vectors(self, rows):
+        """ L2-normalized float64 vectors of the given rows of the matrix. Zero vectors are left as they are.
+
+        Args:
+            rows (numpy.ndarray): rows of the matrix.
+
+        Returns:
+            numpy.ndarray: (len(rows) x dimensions) matrix of unit vectors.
+        """
+        norms = self._norms[rows]
+        return self._matrix[rows].astype(np.float64) / np.where(norms > 0, norms, 1.0)[:, None]
+
+    def get_lemma_rows(self, lemma):
+        """ Given an input lemma get the associated senses that have a nasari vector, with their rows in the matrix.
+            This method requires a LemmaToSensesMapper instance!
+
+        Args:
+            lemma (str): the given lemma/word to search for
+
+        Returns:
+            (list of str, numpy.ndarray): babel synset IDs (same order of get_lemma_senses()) and rows of their vectors.
+        """
+        if isinstance(self._mapper, SemEval): # direct lookup of the rows of the sense ids
+            if self._sense_rows is None:
+                self._sense_rows = self._mapper.nasari_rows(self)
+            sense_ids = self._mapper.get_sense_ids(lemma)
+            rows = self._sense_rows[sense_ids]
+            found = rows >= 0 # skip senses without vector
+            return [self._mapper.get_babelID(i) for i in sense_ids[found].tolist()], rows[found]
+
+        senses = [(synID, self.get_row(synID)) for synID in self.get_lemma_senses(lemma)]
+        senses = [(synID, row) for synID, row in senses if row is not None] # skip senses without vector
+
+        return [synID for synID, _ in senses], np.array([row for _, row in senses], dtype=np.int64)
+
+    def get_synsetID(self, row):
+        """ Babel synset id of a row of the matrix.
+        """
+        return self._synsetIDs[row]
+
+    def get_row(self, synsetID):
+        """ Row of the vector of a babel synset id in the matrix, None if the synset is not in nasari.
+        """
+        return self._rows.get(synsetID)
 
     def get_vector(self, synsetID):
         """ Given an input sense, represented with a babelnet synset id, get the associated nasari embedded vector. 
@@ -106,9 +485,13 @@ class Nasari():
             synsetID (str): babel synset id
 
         Returns:
-            numpy.ndarray : Nasari embedded vector of the given sense
+            numpy.ndarray : Nasari embedded vector of the given sense (a new float64 array, dequantized if the matrix is quantized),
+                None if the sense is not in nasari
         """
-        return self._nasari.get(synsetID)
+        row = self._rows.get(synsetID)
+        if row is None:
+            return None
+        return self.vectors(np.array([row]))[0] # a copy, the matrix is read-only and shared
 
     def get_lemma_vectors(self, lemma):
         """ Given an input lemma get all the associated nasari embedded vectors. 
@@ -123,7 +506,7 @@ class Nasari():
         Returns:
             [list of numpy.ndarray]: list of Nasari embedded vectors
         """
-        if not self._mapper:
+        if self._mapper is None:
             raise  TypeError('To use this method you must assign a mapper in the object initilization')
         return [self.get_vector(synID) for synID in self._mapper.get_synsetsID(lemma)]
     
@@ -140,49 +523,198 @@ class Nasari():
         Returns:
             [list of str]: list of babel synset IDs
         """
-        if not self._mapper:
+        if self._mapper is None:
             raise  TypeError('To use this method you must assign a mapper in the object initilization')
         return [synID for synID in self._mapper.get_synsetsID(lemma)]
 
 
+class RateLimiter():
+    """Token bucket rate limiter, shared by many threads.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): max number of requests per second.
+            burst (int, optional): max number of requests allowed at once. Defaults to 1.
+        """
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request is allowed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0 # next requests wait also for this one
+        
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ResponseCache():
+    """Persistent on-disk cache of API responses, stored in a sqlite database and shared by many threads.
+    """
+
+    def __init__(self, cache_path):
+        """
+        Args:
+            cache_path (pathlib.Path): sqlite database file, created if it doesn't exist.
+        """
+        self._connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)')
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        """Cached response of a key, None on a cache miss.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, response):
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?)', (key, response))
+
+    def close(self):
+        self._connection.close()
+
+
 class BabelNet():
     """Minimal wrapper to BabelNet API.
+
+    Requests share a pooled HTTP session with retries and exponential backoff on connection errors
+    and on 429/5xx responses, and are throttled by a rate limiter. Responses can be cached on disk,
+    so each synset costs one babel coin only once, even across runs.
     """
 
-    def __init__(self, api_key):
+    ENDPOINT_URL = "https://babelnet.io/v5/getSynset" # API endpoint to retrieve synsets
+
+    def __init__(self, api_key, endpoint_url=None, cache_path=None, max_workers=4, rate=10, retries=3, backoff=0.5):
         """[summary]
 
         Args:
             api_key (str): key to get access to the API. Request it at https://babelnet.org/register
+            endpoint_url (str, optional): getSynset endpoint, eg. a local fake_babelnet server. Defaults to None (BabelNet v5 API).
+            cache_path (pathlib.Path, optional): sqlite file of the responses cache. Defaults to None (no cache).
+            max_workers (int, optional): max number of concurrent requests (and of pooled connections). Defaults to 4.
+            rate (float, optional): max number of requests per second. Defaults to 10.
+            retries (int, optional): max number of retries of each request. Defaults to 3.
+            backoff (float, optional): backoff factor between retries (in seconds). Defaults to 0.5.
         """
         self._API_KEY = api_key
-        self._endpoint_URL = "https://babelnet.io/v5/getSynset" # API endpoint to retrieve synsets
+        self._endpoint_URL = endpoint_url or self.ENDPOINT_URL
+        self._max_workers = max_workers
+        self._rate_limiter = RateLimiter(rate, burst=max_workers)
+        self._cache = ResponseCache(cache_path) if cache_path else None
+        self.requests = 0 # number of API calls (ie babel coins spent)
+        self._requests_lock = threading.Lock() # requests are counted by many threads
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def _get_synset(self, babelId, lang):
+        """Raw getSynset response (json text), from the cache if available.
 
+        Raises:
+            RuntimeError: if the API answers with an error message (eg. invalid key or daily limit reached),
+                the response is not cached.
+        """
+        key = '{}|{}'.format(babelId, lang)
+        response = self._cache.get(key) if self._cache is not None else None
+
+        if response is None:
+            params = {
+                    'id': babelId,
+                    'key': self._API_KEY,
+                    'targetLang': lang
+            }
+
+            self._rate_limiter.acquire()
+            http_response = self._session.get(url=self._endpoint_URL, params=params, timeout=30)
+            with self._requests_lock:
+                self.requests += 1
+            http_response.raise_for_status()
+            response = http_response.text
+
+            payload = http_response.json()
+            if 'senses' not in payload: # errors are answered with status 200 and a message
+                raise RuntimeError('BabelNet request of {} failed: {}'.format(babelId, payload.get('message', response)))
+            if self._cache is not None:
+                self._cache.put(key, response)
+
+        return response
 
     def get_synset_lemmas(self, babelId, lang='IT'):
         """Retrieve all associated terms for the given babel sense.
-        Warning: this method make a call to the BabelNet API and execution can be slow if called on batch data!
-        Furthermore, each method call consume one babel coin.
+        Warning: this method make a call to the BabelNet API (if the sense is not cached) and execution can be slow if called on batch data!
+        Furthermore, each API call consume one babel coin. Use get_synsets_lemmas() for batch data.
 
         Args:
             babelId (str): babel synset ID
             lang (str, optional): target language for the search. Defaults to 'IT'.
 
+        Raises:
+            RuntimeError: if the API answers with an error message (eg. daily limit reached).
+
         Returns:
-            [set]: set of terms of for the given sense.
+            [set]: set of terms of for the given sense, None if the sense has no terms.
         """
-        params = {
-                'id': babelId,
-                'key': self._API_KEY,
-                'targetLang': lang
-        }
-
-        response = (requests.get(url=self._endpoint_URL , params=params)
-                            .json())
-        senses = response.get('senses')
+        senses = json.loads(self._get_synset(babelId, lang)).get('senses')
         lemmas = None
 
         if senses and len(senses):
                 lemmas = set([sense['properties']['fullLemma'] for sense in senses]) # no duplicates
 
-        return lemmas    
\ No newline at end of file
+        return lemmas
+
+    def get_synsets_lemmas(self, babelIds, lang='IT', callback=None):
+        """Retrieve the terms of many babel senses, each distinct sense is requested only once 
+        and requests are executed concurrently.
+
+        Args:
+            babelIds (iterable of str): babel synset IDs.
+            lang (str, optional): target language for the search. Defaults to 'IT'.
+            callback (callable, optional): function called with (babelId, lemmas) as soon as a sense is retrieved. Defaults to None.
+
+        Raises:
+            RuntimeError: if the API answers with an error message (eg. daily limit reached). Queued requests
+                are cancelled and senses already retrieved are cached, so a new run resumes from them.
+
+        Returns:
+            dict: babel synset ID -> set of terms (None if the sense has no terms).
+        """
+        lemmas = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {executor.submit(self.get_synset_lemmas, babelId, lang): babelId for babelId in dict.fromkeys(babelIds)}
+            try:
+                for future in as_completed(futures):
+                    babelId = futures[future]
+                    lemmas[babelId] = future.result()
+                    if callback:
+                        callback(babelId, lemmas[babelId])
+            except BaseException:
+                # leaving the with block would wait for all the queued requests, spending their babel coins
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        return lemmas
+
+    def close(self):
+        self._session.close()
+        if self._cache is not None:
+            self._cache.close()
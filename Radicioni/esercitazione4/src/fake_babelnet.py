@@ -0,0 +1,142 @@
+import ast
+import csv
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+"""
+Local stand-in of the BabelNet getSynset API, to test data_manager.BabelNet offline (no key, no babel coins).
+
+Synsets terms are read from the manual annotations in data/senses_annotations.tsv, unknown synsets
+have no senses. The server can simulate network latency, transient failures (503 responses)
+to exercise client retries and a daily requests limit (error message once exceeded). Run it from the esercitazione4 directory with:
+
+    python -m src.fake_babelnet --port 8080
+
+then use BabelNet(api_key='fake', endpoint_url='http://localhost:8080/v5/getSynset').
+"""
+
+
+def load_synsets_terms(annotations_path):
+    """Terms of each annotated synset.
+
+    Args:
+        annotations_path (pathlib.Path): senses annotations tsv file.
+
+    Returns:
+        dict: babel synset ID -> list of terms.
+    """
+    synsets = {}
+    with annotations_path.open('r', newline='') as file:
+        for row in csv.DictReader(file, delimiter='\t'):
+            for sense_column, terms_column in (('senseID1', 'terms1'), ('senseID2', 'terms2')):
+                if row[sense_column] and row[terms_column] not in ('', 'None'):
+                    try:
+                        synsets[row[sense_column]] = sorted(ast.literal_eval(row[terms_column])) # terms are python set literals
+                    except (ValueError, SyntaxError): # malformed hand annotation
+                        pass
+
+    return synsets
+
+
+class FakeBabelNetServer(ThreadingHTTPServer):
+    """HTTP server answering to GET /v5/getSynset?id=...&key=...&targetLang=... like BabelNet.
+    """
+
+    def __init__(self, address, synsets, latency=0.0, failure_rate=0.0, seed=0, limit=None):
+        """
+        Args:
+            address ((str, int)): host and port, port 0 to pick a free one.
+            synsets (dict): babel synset ID -> list of terms.
+            latency (float, optional): seconds waited before each response. Defaults to 0.0.
+            failure_rate (float, optional): probability of a 503 response. Defaults to 0.0.
+            seed (int, optional): seed of failures. Defaults to 0.
+            limit (int, optional): number of requests answered before the daily limit error. Defaults to None (no limit).
+        """
+        super().__init__(address, _GetSynsetHandler)
+        self.synsets = synsets
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.limit = limit
+        self.requests = 0 # number of received requests
+        self.requested_ids = [] # synset ID of each received request
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://{}:{}/v5/getSynset'.format(*self.server_address[:2])
+
+    def count_request(self, babelId):
+        """Count a request and decide if it fails.
+
+        Returns:
+            (bool, bool): the request fails, the daily limit is exceeded.
+        """
+        with self._lock:
+            self.requests += 1
+            self.requested_ids.append(babelId)
+            return self._random.random() < self.failure_rate, self.limit is not None and self.requests > self.limit
+
+
+class _GetSynsetHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        failure, limit_exceeded = self.server.count_request(params.get('id', [''])[0])
+        time.sleep(self.server.latency)
+
+        if url.path != '/v5/getSynset':
+            self._reply(404, {'message': 'Not found'})
+        elif failure:
+            self._reply(503, {'message': 'Service unavailable'})
+        elif 'key' not in params or limit_exceeded:
+            self._reply(200, {'message': 'Your key is not valid or the daily requests limit has been reached.'})
+        else:
+            terms = self.server.synsets.get(params.get('id', [''])[0], [])
+            lang = params.get('targetLang', ['IT'])[0]
+            self._reply(200, {'senses': [{'properties': {'fullLemma': term, 'language': lang}} for term in terms]})
+
+    def _reply(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass # keep test output clean
+
+
+def serve(annotations_path=Path('data/senses_annotations.tsv'), port=0, latency=0.0, failure_rate=0.0, limit=None):
+    """Start a fake BabelNet server in a background thread, stop it with server.shutdown().
+
+    Returns:
+        FakeBabelNetServer: the running server, its endpoint is server.url
+    """
+    server = FakeBabelNetServer(('localhost', port), load_synsets_terms(annotations_path), latency, failure_rate, limit=limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local fake BabelNet getSynset API')
+    parser.add_argument('--annotations', type=Path, default=Path('data/senses_annotations.tsv'))
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--limit', type=int, default=None, help='daily requests limit')
+    args = parser.parse_args()
+
+    server = FakeBabelNetServer(('localhost', args.port), load_synsets_terms(args.annotations), args.latency, args.failure_rate,
+                                limit=args.limit)
+    print("Fake BabelNet serving {} synsets at {}".format(len(server.synsets), server.url))
+    server.serve_forever()
@@ -1,51 +1,136 @@
 import csv
-from pathlib import Path
-import numpy as np
-import pandas as pd
-import data_manager as dm
 import itertools
-from utility import *
-from dotenv import load_dotenv
 import os
-import requests
+import time
+from pathlib import Path
+
+import src.data_manager as dm
+
+"""Script to help retrieve all babels synsets associated to lemmas and then generate a file to select the right sense and
+    annotate manually. The script use babelnet API and so a key is required (BABELNET_KEY environment variable or .env file),
+    BABELNET_URL optionally overrides the getSynset endpoint (eg. a local src.fake_babelnet server).
+
+    The pipeline has three stages:
+
+    * senses: the babel synsets of both lemmas of each annotated pair are collected from SemEval, each distinct synset once.
+    * lemmas: the terms of all distinct synsets are fetched concurrently. Responses are cached in output/babelnet_cache.sqlite
+      as soon as they arrive, so an interrupted run resumes from the synsets already retrieved.
+    * join: for each pair the candidate senses of the two lemmas are written side by side in output/senses_annotations.tsv.
+
+    The script must be executed from the esercitazione4 directory:
 
-"""Script to help retrieve all babels synsets associated to lemmas and then geneerate a file to select the right sense and 
-    annotate manually. The script use balebelnet API and so a key is required in .env file and takes some time to execute 
+        python -m src.generate_senses
 """
 
-if __name__ == '__main__':
+COLUMNS = ['lemma1', 'senseID1', 'terms1', 'lemma2', 'senseID2', 'terms2']
 
-    load_dotenv() # for babelnet API key
 
-    semeval = dm.SemEval(Path('data/SemEval17_IT_senses2synsets.txt'))
-    nasari = dm.Nasari(Path('data/mini_NASARI.tsv'), semeval)
-    babelnet = dm.BabelNet(os.environ['BABELNET_KEY'])
+def read_pairs(annotations_path):
+    """ Read the (lemma1, lemma2) pairs of the words annotations file.
+    """
+    with annotations_path.open('r', newline='') as file:
+        return [(row['lemma1'], row['lemma2']) for row in csv.DictReader(file, delimiter='\t')]
+
+
+def collect_senses(pairs, semeval):
+    """ Babel synsets of every lemma of the given pairs.
+
+    Args:
+        pairs (list of (str, str)): annotated lemma pairs.
+        semeval (data_manager.SemEval): lemma to senses mapper.
+
+    Returns:
+        (dict, list): lemma -> list of babel synset IDs (empty if the lemma is not in SemEval), distinct babel synset IDs.
+    """
+    senses = {}
+    for lemma in itertools.chain.from_iterable(pairs):
+        if lemma not in senses:
+            try:
+                senses[lemma] = list(semeval.get_synsetsID(lemma))
+            except KeyError:
+                senses[lemma] = []
 
-    annotations = pd.read_csv(Path('data/words_annotations.tsv'), sep='\t')
-    
+    babelIds = list(dict.fromkeys(itertools.chain.from_iterable(senses.values()))) # keep first seen order
 
-    words1 = pd.DataFrame(annotations['word1'])
-    words1['babelID'] = words1.apply(lambda x: list(semeval.get_synsets(x['word1'])), axis=1)
-    words1 = words1.explode('babelID', ignore_index=True)
+    return senses, babelIds
 
-    words1['lemmas'] = words1.apply(lambda x: babelnet.get_synset_lemmas(x['babelID']), axis=1)
 
-    words1.to_csv('output/word1')
+def format_terms(terms):
+    """ Terms as a python set literal (sorted, so output is reproducible), 'None' if the sense has no terms.
+    """
+    return '{' + ', '.join(repr(term) for term in sorted(terms)) + '}' if terms else 'None'
+
+
+def write_senses_annotations(output_path, pairs, senses, lemmas):
+    """ Write the candidate senses of each pair: one row for each sense, senses of lemma1 and lemma2 side by side.
+
+    Returns:
+        int: number of written rows.
+    """
+    rows = 0
+    with output_path.open('w', newline='') as file:
+        writer = csv.writer(file, delimiter='\t')
+        writer.writerow(COLUMNS)
+
+        for lemma1, lemma2 in pairs:
+            for babelId1, babelId2 in itertools.zip_longest(senses[lemma1], senses[lemma2]):
+                writer.writerow([lemma1, babelId1 or '', format_terms(lemmas.get(babelId1)) if babelId1 else '',
+                                 lemma2, babelId2 or '', format_terms(lemmas.get(babelId2)) if babelId2 else ''])
+                rows += 1
+
+    return rows
+
+
+def load_dotenv():
+    """ Load the .env file, if python-dotenv is installed.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate the candidate senses of annotated word pairs for manual annotation')
+    parser.add_argument('--semeval', type=Path, default=Path('data/SemEval17_IT_senses2synsets.txt'))
+    parser.add_argument('--annotations', type=Path, default=Path('data/words_annotations.tsv'))
+    parser.add_argument('--output', type=Path, default=Path('output/senses_annotations.tsv'))
+    parser.add_argument('--cache', type=Path, default=Path('output/babelnet_cache.sqlite'), help='sqlite cache of babelnet responses')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=10, help='max babelnet requests per second')
+    args = parser.parse_args()
+
+    load_dotenv() # for babelnet API key
+    args.output.parent.mkdir(parents=True, exist_ok=True)
 
-    words2 = pd.DataFrame(annotations['word2'])
-    words2['babelID'] = words2.apply(lambda x: list(semeval.get_synsets(x['word2'])), axis=1)
-    words2 = words2.explode('babelID', ignore_index=True)
+    start = time.perf_counter()
+    pairs = read_pairs(args.annotations)
+    senses, babelIds = collect_senses(pairs, dm.SemEval(args.semeval))
+    missing = [lemma for lemma, lemma_senses in senses.items() if not lemma_senses]
+    print("senses: {} pairs, {} lemmas ({} not in SemEval), {} distinct synsets in {:.2f}s".format(
+          len(pairs), len(senses), len(missing), len(babelIds), time.perf_counter() - start))
 
-    words2['lemmas'] = words2.apply(lambda x: babelnet.get_synset_lemmas(x['babelID']), axis=1)
+    start = time.perf_counter()
+    babelnet = dm.BabelNet(os.environ['BABELNET_KEY'], endpoint_url=os.environ.get('BABELNET_URL'),
+                           cache_path=args.cache, max_workers=args.workers, rate=args.rate)
+    progress = itertools.count(1)
 
-    words1.to_pickle('output/words1_df.pkl')
-    words2.to_pickle('output/words2_df.pkl')
+    def report(babelId, terms):
+        done = next(progress)
+        if done % 100 == 0 or done == len(babelIds):
+            print("  {}/{} synsets".format(done, len(babelIds)))
 
-    words1 = pd.read_pickle(Path('output/words1_df.pkl'))
-    words2 = pd.read_pickle(Path('output/words2_df.pkl'))
+    try:
+        lemmas = babelnet.get_synsets_lemmas(babelIds, callback=report)
+    finally:
+        babelnet.close()
+    print("lemmas: {} synsets ({} without terms), {} API requests, {} from cache in {:.2f}s".format(
+          len(lemmas), sum(terms is None for terms in lemmas.values()), babelnet.requests,
+          len(lemmas) - babelnet.requests, time.perf_counter() - start))
 
-    senses1 = pd.read_csv('output/words1', sep=',', index_col=0, header=0, names=['lemma1','senseID1','terms1']).reset_index(drop=True)
-    senses2 = pd.read_csv('output/words2', sep=',', index_col=0, header=0, names=['lemma2','senseID2','terms2']).reset_index(drop=True)
-    senses = pd.concat([senses1,senses2], axis=1)
-    
-    senses.to_csv('output/senses_annotations.tsv', sep='\t')
+    start = time.perf_counter()
+    rows = write_senses_annotations(args.output, pairs, senses, lemmas)
+    print("join: {} rows written to {} in {:.2f}s".format(rows, args.output, time.perf_counter() - start))
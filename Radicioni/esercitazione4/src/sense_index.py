@@ -0,0 +1,339 @@
+import time
+from pathlib import Path
+
+import numpy as np
+
+import src.data_manager as dm
+
+"""
+Nearest-neighbour search of the most similar Babel synsets (by cosine similarity) over the whole embedded Nasari.
+
+Two indexes with the same API are available:
+
+* ExactIndex: brute-force top-k with blocked matrix products, fine for small resources (eg. mini_NASARI).
+* LSHIndex: approximate index based on random-projection Locality Sensitive Hashing. Vectors are hashed
+  in many tables by the signs of their projections on random hyperplanes, candidates are the vectors in
+  the same buckets of the query (optionally also in the buckets at hamming distance 1, ie multi-probe)
+  and are re-ranked with the exact cosine similarity. More tables/probes mean higher recall and higher latency,
+  more bits mean smaller buckets, ie lower latency and lower recall.
+
+The benchmark reports recall@k of the approximate index (wrt the exact one) and queries/sec of both:
+
+    python -m src.sense_index --nasari data/mini_NASARI.tsv --bits 12 --tables 8 --probes 1
+"""
+
+
+def inverse_norms(nasari):
+    """ float32 inverse L2 norm of each vector of the nasari matrix, 1 for zero vectors (left as they are).
+    Cosine similarities are computed on the stored (possibly quantized) matrix and then multiplied by them,
+    so no normalized copy of the matrix is needed.
+    """
+    norms = nasari.norms
+    return (1.0 / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def _top_k(scores, rows, k):
+    """ Top k (score, row) pairs of each query, sorted by descending score and then by row.
+
+    Args:
+        scores (numpy.ndarray): (queries x candidates) scores.
+        rows (numpy.ndarray): (queries x candidates) rows of the candidates.
+        k (int): number of neighbours.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): (queries x k) scores and rows.
+    """
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores, rows = np.take_along_axis(scores, best, axis=1), np.take_along_axis(rows, best, axis=1)
+
+    order = np.lexsort((rows, -scores), axis=1)
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+class SenseIndex():
+    """ Interface of the nearest-neighbour indexes over a data_manager.Nasari resource.
+    """
+
+    def __init__(self, nasari):
+        """
+        Args:
+            nasari (data_manager.Nasari): embedded nasari resource to index.
+        """
+        self._nasari = nasari
+        self._matrix = nasari.matrix # as stored, float32 or quantized
+        self._inverse_norms = inverse_norms(nasari)
+
+    def search(self, queries, k=10):
+        """ Top k most similar vectors of each query.
+
+        Args:
+            queries (numpy.ndarray): (queries x dimensions) query vectors.
+            k (int, optional): number of neighbours. Defaults to 10.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): (queries x k) cosine similarities and rows of the nasari matrix,
+                sorted by descending similarity. Missing neighbours have -inf similarity and row -1.
+        """
+        pass
+
+    def _scores(self, start, stop, queries):
+        """ (queries x rows) cosine similarities of unit queries with the vectors of a block of rows,
+        normalized on the fly with the vector norms.
+        """
+        block = np.asarray(self._matrix[start:stop], dtype=np.float32)
+        return (queries @ block.T) * self._inverse_norms[start:stop]
+
+    def _unit_vectors(self, rows):
+        return self._nasari.unit_vectors(rows).astype(np.float32)
+
+    def _normalize(self, queries):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries / np.where(norms > 0, norms, 1.0)
+
+    def most_similar(self, synsetID, k=10):
+        """ Top k synsets most similar to a given synset (the synset itself excluded).
+
+        Args:
+            synsetID (str): babel synset id.
+            k (int, optional): number of synsets. Defaults to 10.
+
+        Returns:
+            list of (str, float): babel synset ids and cosine similarities, empty if the synset is not in nasari.
+        """
+        row = self._nasari.get_row(synsetID)
+        if row is None:
+            return []
+
+        scores, rows = self.search(self._unit_vectors(np.array([row])), k + 1)
+        return [(self._nasari.get_synsetID(r), float(score)) for score, r in zip(scores[0], rows[0])
+                if r >= 0 and r != row][:k]
+
+    def most_similar_to_lemma(self, lemma, k=10):
+        """ Top k synsets most similar to any sense of a lemma (the lemma senses excluded).
+        The similarity of a synset is its max similarity among the lemma senses.
+        This method requires a nasari with a LemmaToSensesMapper instance!
+
+        Args:
+            lemma (str): the given lemma/word to search for.
+            k (int, optional): number of synsets. Defaults to 10.
+
+        Returns:
+            list of (str, float): babel synset ids and cosine similarities.
+        """
+        senses, rows = self._nasari.get_lemma_rows(lemma)
+        if not senses:
+            return []
+
+        scores, neighbours = self.search(self._unit_vectors(rows), k + len(senses))
+        sense_rows = set(rows.tolist())
+        best = {}
+        for score, r in zip(scores.ravel().tolist(), neighbours.ravel().tolist()):
+            if r >= 0 and r not in sense_rows and score > best.get(r, -np.inf):
+                best[r] = score
+
+        ranking = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self._nasari.get_synsetID(r), score) for r, score in ranking]
+
+
+class ExactIndex(SenseIndex):
+    """ Exact top-k search: the similarity of each query with all the vectors is computed
+    with a matrix product for each block of rows, keeping only the top k of each block.
+    """
+
+    def __init__(self, nasari, block_size=16384):
+        """
+        Args:
+            nasari (data_manager.Nasari): embedded nasari resource to index.
+            block_size (int, optional): rows of the nasari matrix of each matrix product. Defaults to 16384.
+        """
+        super().__init__(nasari)
+        self._block_size = block_size
+
+    def search(self, queries, k=10):
+        queries = self._normalize(queries)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), 0), -1, dtype=np.int64)
+
+        for start in range(0, len(self._matrix), self._block_size):
+            scores = self._scores(start, start + self._block_size, queries)
+            rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            best_scores, best_rows = _top_k(np.hstack([best_scores, scores]), np.hstack([best_rows, rows]), k)
+
+        return _pad(best_scores, best_rows, k)
+
+
+class LSHIndex(SenseIndex):
+    """ Approximate top-k search with random-projection LSH, see module docstring.
+    """
+
+    def __init__(self, nasari, n_bits=12, n_tables=8, probes=0, seed=0):
+        """
+        Args:
+            nasari (data_manager.Nasari): embedded nasari resource to index.
+            n_bits (int, optional): bits of the hash of each table (at most 62). Defaults to 12.
+            n_tables (int, optional): number of hash tables. Defaults to 8.
+            probes (int, optional): 0 to look only in the query bucket, 1 to look also in the buckets at hamming distance 1. Defaults to 0.
+            seed (int, optional): seed of the random hyperplanes. Defaults to 0.
+        """
+        super().__init__(nasari)
+        self.probes = probes
+        self._planes = np.random.default_rng(seed).standard_normal((n_tables, n_bits, self._matrix.shape[1])).astype(np.float32)
+        self._build()
+
+    def _hash(self, vectors):
+        """ (tables x vectors) hash codes of some vectors.
+        """
+        bits = np.einsum('tbd,nd->tnb', self._planes, vectors) > 0
+        return bits.astype(np.int64) @ (1 << np.arange(self._planes.shape[1], dtype=np.int64))
+
+    def _build(self):
+        """ Hash all the vectors: each table is represented by the row ids sorted by hash code.
+        Signs of the projections don't depend on the vector norms, so the stored vectors are hashed as they are.
+        """
+        self._codes = np.empty((self._planes.shape[0], len(self._matrix)), dtype=np.int64)
+        for start in range(0, len(self._matrix), 65536):
+            self._codes[:, start:start + 65536] = self._hash(np.asarray(self._matrix[start:start + 65536], dtype=np.float32))
+
+        self._order = np.argsort(self._codes, axis=1, kind='stable')
+        self._sorted_codes = np.take_along_axis(self._codes, self._order, axis=1)
+
+    def _bucket_ranges(self, codes):
+        """ Ranges of the buckets of the queries (and of the probed buckets) in the flattened hash tables.
+
+        Args:
+            codes (numpy.ndarray): (tables x queries) hash codes of the queries.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): (queries x tables * probes) start and end of each bucket in self._order.ravel().
+        """
+        n_tables, n_bits = self._planes.shape[:2]
+        masks = np.array([0] + ([1 << bit for bit in range(n_bits)] if self.probes else []), dtype=np.int64)
+
+        starts, ends = [], []
+        for table in range(n_tables):
+            probes = codes[table][:, None] ^ masks[None, :] # (queries x probes) buckets
+            offset = table * self._order.shape[1]
+            starts.append(np.searchsorted(self._sorted_codes[table], probes) + offset)
+            ends.append(np.searchsorted(self._sorted_codes[table], probes + 1) + offset)
+
+        return np.hstack(starts), np.hstack(ends)
+
+    def search(self, queries, k=10):
+        queries = self._normalize(queries)
+        starts, ends = self._bucket_ranges(self._hash(queries))
+        order = self._order.ravel()
+
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, query in enumerate(queries):
+            # concatenate all the bucket ranges of the query
+            lengths = ends[i] - starts[i]
+            positions = np.repeat(starts[i] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            rows = np.unique(order[positions])
+            if len(rows) == 0:
+                continue
+
+            scores = (np.asarray(self._matrix[rows], dtype=np.float32) @ query) * self._inverse_norms[rows] # exact re-ranking of the candidates
+            scores, rows = _top_k(scores[None, :], rows[None, :], k)
+            all_scores[i, :scores.shape[1]], all_rows[i, :rows.shape[1]] = scores[0], rows[0]
+
+        return all_scores, all_rows
+
+    def save(self, index_path):
+        """ Save the index (hyperplanes and hash tables, not the vectors) in a .npz file.
+        """
+        np.savez(index_path, planes=self._planes, codes=self._codes, order=self._order,
+                 sorted_codes=self._sorted_codes, probes=self.probes)
+
+    @classmethod
+    def load(cls, index_path, nasari):
+        """ Load an index saved with save(), the nasari resource must be the same used to build it.
+
+        Args:
+            index_path (pathlib.Path): .npz file of the index.
+            nasari (data_manager.Nasari): embedded nasari resource indexed.
+
+        Returns:
+            LSHIndex: the loaded index.
+        """
+        index = cls.__new__(cls)
+        SenseIndex.__init__(index, nasari)
+
+        with np.load(index_path) as arrays:
+            index._planes, index._codes = arrays['planes'], arrays['codes']
+            index._order, index._sorted_codes = arrays['order'], arrays['sorted_codes']
+            index.probes = int(arrays['probes'])
+
+        if index._codes.shape[1] != len(index._matrix):
+            raise ValueError('The index was built on a different nasari resource')
+
+        return index
+
+
+def _pad(scores, rows, k):
+    """ Pad results to k columns when the resource has less than k vectors.
+    """
+    missing = k - scores.shape[1]
+    if missing > 0:
+        scores = np.hstack([scores, np.full((len(scores), missing), -np.inf, dtype=scores.dtype)])
+        rows = np.hstack([rows, np.full((len(rows), missing), -1, dtype=rows.dtype)])
+
+    return scores, rows
+
+
+def benchmark(exact_index, approximate_index, queries, k=10):
+    """ Compare an approximate index against the exact one.
+
+    Args:
+        exact_index (ExactIndex): exact index.
+        approximate_index (SenseIndex): approximate index on the same resource.
+        queries (numpy.ndarray): (queries x dimensions) query vectors.
+        k (int, optional): number of neighbours. Defaults to 10.
+
+    Returns:
+        dict: recall@k of the approximate index and queries/sec of both indexes.
+    """
+    start = time.perf_counter()
+    _, exact_rows = exact_index.search(queries, k)
+    exact_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, approximate_rows = approximate_index.search(queries, k)
+    approximate_elapsed = time.perf_counter() - start
+
+    hits = sum(len(set(exact[exact >= 0]) & set(approximate[approximate >= 0]))
+               for exact, approximate in zip(exact_rows, approximate_rows))
+    relevant = int((exact_rows >= 0).sum())
+
+    return {'k': k,
+            'queries': len(queries),
+            'recall': hits / relevant if relevant else 0.0,
+            'exact_qps': len(queries) / exact_elapsed if exact_elapsed else 0.0,
+            'approximate_qps': len(queries) / approximate_elapsed if approximate_elapsed else 0.0}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark nearest-neighbour sense search over embedded Nasari')
+    parser.add_argument('--nasari', type=Path, default=Path('data/mini_NASARI.tsv'))
+    parser.add_argument('--bits', type=int, default=12)
+    parser.add_argument('--tables', type=int, default=8)
+    parser.add_argument('--probes', type=int, choices=[0, 1], default=0)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--save', type=Path, default=None, help='optional .npz file where to save the LSH index')
+    args = parser.parse_args()
+
+    nasari = dm.Nasari(args.nasari)
+    exact = ExactIndex(nasari)
+    lsh = LSHIndex(nasari, args.bits, args.tables, args.probes)
+    if args.save:
+        lsh.save(args.save)
+
+    rng = np.random.default_rng(0)
+    queries = nasari.unit_vectors(rng.choice(len(nasari.matrix), size=min(args.queries, len(nasari.matrix)), replace=False))
+    stats = benchmark(exact, lsh, queries, args.k)
+    print("recall@{k}: {recall:.3f} on {queries} queries, exact {exact_qps:.1f} queries/sec, LSH {approximate_qps:.1f} queries/sec".format(**stats))
@@ -1,21 +1,35 @@
 import numpy as np
 from scipy.spatial import distance
 import itertools
+from collections import namedtuple
+
+TIE_TOLERANCE = 1e-12 # max difference between cosine scores considered equal
+TOP_K = 50 # number of top dimensions compared by rank based similarities
+GRAM_MAX_VECTORS = 1024 # paired forms score all the pairs of up to this number of vectors at once (8 MB float64 block)
 
 
 def sense_similarity(word1, word2, similarity_func, nasari):
     """ Compute the sense similarity as maximum among 
         all possible pair of senses of the given words.
 
+        If the similarity function is a registered kernel with a matrix form (see KERNELS), the similarity
+        of all the sense pairs is computed at once.
+
     Args:
         word1 (str): first word
         word2 (str): second word
-        similarity_func (callable): similarity function with (numpy.ndarray, numpy.ndarray) -> float signature.
+        similarity_func (callable or str): similarity function with (numpy.ndarray, numpy.ndarray) -> float signature, or the name of a registered kernel.
         nasari (data_manger.Nasari): a Nasari lexical resource instance 
 
     Returns:
         (float, str,str): return a triple (score, babel synset id, babel synset id) with maximal similarity and the sense pair that maximize the similarity.
     """
+    kernel = get_kernel(similarity_func)
+    if kernel is not None and kernel.matrix is not None: # vectorized path
+        return _matrix_sense_similarity(word1, word2, kernel.matrix, nasari)
+    if kernel is not None:
+        similarity_func = kernel.scalar
+
     w1_vectors = zip(nasari.get_lemma_senses(word1), 
                      nasari.get_lemma_vectors(word1)) # all senses pair of (synset id, nasari vector)
     w2_vectors = zip(nasari.get_lemma_senses(word2), 
@@ -40,6 +54,91 @@ def sense_similarity(word1, word2, similarity_func, nasari):
     return max_score, max_senses[0], max_senses[1] # (score, word1, word2) instead of (score, (word1,word2))
 
 
+def sense_similarity_batch(word_pairs, nasari, batch_size=256):
+    """ Cosine sense similarity of many word pairs, same results of sense_similarity() with cosine_similarity.
+
+    Sense vectors are L2-normalized once, then for each batch of word pairs the senses of the first and second 
+    words are stacked in two zero-padded (pairs x senses x dimensions) tensors, so the cosine similarity 
+    of all the sense pairs of the batch is computed with a single batched matrix product. The similarity of each word pair
+    is the max among its sense pairs, ties are broken by the first pair in (word1 sense, word2 sense) order.
+
+    Args:
+        word_pairs (iterable of (str, str)): word pairs (eg. the lemma1, lemma2 columns of words_annotations.tsv).
+        nasari (data_manger.Nasari): a Nasari lexical resource instance 
+        batch_size (int, optional): number of word pairs of each matrix product. Defaults to 256.
+
+    Returns:
+        list of (float, str, str): a triple (score, babel synset id, babel synset id) for each word pair, (None, None, None) when a word has no sense vectors.
+    """
+    word_pairs = list(word_pairs)
+
+    # senses of each word and their rows in the unit vectors matrix
+    words = {}
+    rows = []
+    for word in (word for pair in word_pairs for word in pair):
+        if word not in words:
+            senses, word_rows = nasari.get_lemma_rows(word)
+            words[word] = (senses, np.arange(len(rows), len(rows) + len(senses)))
+            rows.extend(word_rows)
+
+    # an extra zero vector used as padding
+    unit = np.vstack([nasari.unit_vectors(np.array(rows, dtype=np.int64)), np.zeros((1, nasari.matrix.shape[1]))])
+
+    # pairs with similar numbers of senses are batched together, to reduce padding
+    order = sorted(range(len(word_pairs)), key=lambda k: (len(words[word_pairs[k][0]][0]), len(words[word_pairs[k][1]][0])))
+
+    results = [None] * len(word_pairs)
+    for start in range(0, len(word_pairs), batch_size):
+        batch_order = order[start:start + batch_size]
+        batch = [word_pairs[k] for k in batch_order]
+        idx1 = _padded_rows([words[word1][1] for word1, _ in batch], pad=len(rows))
+        idx2 = _padded_rows([words[word2][1] for _, word2 in batch], pad=len(rows))
+
+        scores = np.clip(np.matmul(unit[idx1], unit[idx2].transpose(0, 2, 1)), -1.0, 1.0)
+        scores[(idx1 == len(rows))[:, :, None] | (idx2 == len(rows))[:, None, :]] = -np.inf # padding pairs
+
+        # row-major first max like the pairs product, scores equal up to rounding (eg. same sense of both words) are ties
+        flat_scores = scores.reshape(len(batch), -1)
+        best = np.argmax(flat_scores >= flat_scores.max(axis=1, keepdims=True) - TIE_TOLERANCE, axis=1)
+
+        for k, (word1, word2), pair_scores, pair_best in zip(batch_order, batch, scores, best):
+            (senses1, _), (senses2, _) = words[word1], words[word2]
+            if not senses1 or not senses2:
+                results[k] = (None, None, None)
+                continue
+
+            i, j = np.unravel_index(pair_best, pair_scores.shape)
+            results[k] = (float(pair_scores[i, j]), senses1[i], senses2[j])
+
+    return results
+
+
+def _matrix_sense_similarity(word1, word2, matrix_func, nasari):
+    """ sense_similarity() with a matrix similarity function, scoring all the sense pairs at once.
+    """
+    senses1, rows1 = nasari.get_lemma_rows(word1)
+    senses2, rows2 = nasari.get_lemma_rows(word2)
+    if not senses1 or not senses2:
+        return None, None, None
+
+    scores = matrix_func(nasari.vectors(rows1), nasari.vectors(rows2))
+
+    # row-major first max like the pairs product, scores equal up to rounding are ties
+    flat_scores = scores.ravel()
+    i, j = divmod(int(np.argmax(flat_scores >= flat_scores.max() - TIE_TOLERANCE)), len(senses2))
+    return float(scores[i, j]), senses1[i], senses2[j]
+
+
+def _padded_rows(rows_list, pad):
+    """ Stack arrays of rows of different lengths in a matrix, padding them with the pad row.
+    """
+    padded = np.full((len(rows_list), max(max(len(rows) for rows in rows_list), 1)), pad, dtype=np.int64)
+    for i, rows in enumerate(rows_list):
+        padded[i, :len(rows)] = rows
+
+    return padded
+
+
 def sense_similarity_score(word1, word2, similarity_func, nasari):
     """Just an helper function wrapping sense_similarity function. Compute only the similarity score without senses.
     Args:
@@ -64,4 +163,249 @@ def cosine_similarity(v1, v2):
     Returns:
         [float]: similarity score in [0,1] range.
     """
-    return 1-distance.cosine(v1,v2) # since scipy function is a distance
\ No newline at end of file
+    return 1-distance.cosine(v1,v2) # since scipy function is a distance
+
+
+def cosine_similarity_matrix(A, B):
+    """ Cosine similarity between all the rows of two matrices, zero vectors have similarity 0.
+
+    Args:
+        A (numpy.ndarray): (n x dimensions) matrix.
+        B (numpy.ndarray): (m x dimensions) matrix.
+
+    Returns:
+        numpy.ndarray: (n x m) similarity scores.
+    """
+    norms_A, norms_B = np.linalg.norm(A, axis=1), np.linalg.norm(B, axis=1)
+    norms = np.outer(np.where(norms_A > 0, norms_A, 1.0), np.where(norms_B > 0, norms_B, 1.0))
+    return np.clip(A @ B.T / norms, -1.0, 1.0)
+
+
+def _all_pairs_paired(matrix_func, vectors):
+    """ Paired form of a matrix similarity function for up to GRAM_MAX_VECTORS vectors: the similarity of all
+    the vector pairs is computed at once and then gathered, None for more vectors.
+    """
+    if len(vectors) > GRAM_MAX_VECTORS:
+        return None
+    scores = matrix_func(vectors, vectors)
+    return lambda left, right: scores[left, right]
+
+
+def cosine_similarity_paired(vectors):
+    """ Paired form of cosine_similarity(), see register_kernel(). Vectors are L2-normalized once.
+    """
+    paired = _all_pairs_paired(cosine_similarity_matrix, vectors)
+    if paired is not None:
+        return paired
+
+    norms = np.linalg.norm(vectors, axis=1)
+    unit = vectors / np.where(norms > 0, norms, 1.0)[:, None]
+    return lambda left, right: np.clip(np.einsum('ij,ij->i', unit[left], unit[right]), -1.0, 1.0)
+
+
+def dot_similarity(v1, v2):
+    """ Dot product of two vectors.
+    """
+    return float(np.dot(v1, v2))
+
+
+def dot_similarity_matrix(A, B):
+    """ Dot product between all the rows of two matrices.
+    """
+    return A @ B.T
+
+
+def dot_similarity_paired(vectors):
+    """ Paired form of dot_similarity(), see register_kernel().
+    """
+    paired = _all_pairs_paired(dot_similarity_matrix, vectors)
+    if paired is not None:
+        return paired
+    return lambda left, right: np.einsum('ij,ij->i', vectors[left], vectors[right])
+
+
+def euclidean_similarity(v1, v2):
+    """ Similarity in (0,1] range based on the euclidean distance, ie. 1 / (1 + distance).
+    """
+    return 1 / (1 + distance.euclidean(v1, v2))
+
+
+def euclidean_similarity_matrix(A, B):
+    """ Euclidean based similarity between all the rows of two matrices, see euclidean_similarity().
+    """
+    return 1 / (1 + distance.cdist(A, B, 'euclidean'))
+
+
+def euclidean_similarity_paired(vectors):
+    """ Paired form of euclidean_similarity(), see register_kernel().
+    """
+    return lambda left, right: 1 / (1 + np.linalg.norm(vectors[left] - vectors[right], axis=1)) # only the requested pairs
+
+
+def _top_dimensions(M, top_k):
+    """ Indexes of the top_k largest dimensions of each row, by decreasing value (ties by dimension index).
+    """
+    return np.argsort(-M, axis=1, kind='stable')[:, :top_k]
+
+
+def _overlap_normalization(max_overlap):
+    """ WO denominators for every possible number n of overlapped dimensions,
+    ie. sum(1 / 2i) for i in 1..n, with n in 0..max_overlap (1 for n = 0, to avoid divisions by zero).
+    """
+    return np.concatenate(([1.0], np.cumsum(1.0 / (2 * np.arange(1, max_overlap + 1)))))
+
+
+def _shared_ranks_paired(vectors, top_k):
+    """ Top dimensions of each vector are computed once and their ranks stored in a dense (vectors x dimensions)
+    matrix (0 for the other dimensions). The returned function gathers, for each pair, the ranks in the right vector
+    of the top dimensions of the left one (ordered by rank in the left vector, 0 if not shared).
+    """
+    top = _top_dimensions(vectors, top_k)
+    ranks = np.zeros(vectors.shape, dtype=np.intp)
+    np.put_along_axis(ranks, top, np.arange(1, top.shape[1] + 1)[None, :], axis=1)
+
+    def shared_ranks(left, right):
+        return ranks[right[:, None], top[left]]
+
+    return shared_ranks, top.shape[1]
+
+
+def weighted_overlap(v1, v2, top_k=TOP_K):
+    """ Weighted Overlap (WO) similarity measure by Pilehvar et al. (2013) applied to the ranks
+    of the top_k largest dimensions of embedded vectors.
+
+    Args:
+        v1 (numpy.ndarray): vector 1
+        v2 (numpy.ndarray): vector 2
+        top_k (int, optional): number of ranked dimensions of each vector. Defaults to TOP_K.
+
+    Returns:
+        float: square root of the weighted overlap.
+    """
+    ranks1 = {dim: rank for rank, dim in enumerate(_top_dimensions(np.atleast_2d(v1), top_k)[0].tolist(), 1)}
+    ranks2 = {dim: rank for rank, dim in enumerate(_top_dimensions(np.atleast_2d(v2), top_k)[0].tolist(), 1)}
+    overlap = ranks1.keys() & ranks2.keys()
+
+    if not overlap:
+        return 0.0
+
+    numerator = sum(1 / (ranks1[dim] + ranks2[dim]) for dim in overlap)
+    denominator = sum(1 / (2 * i) for i in range(1, len(overlap) + 1))
+    return np.sqrt(numerator / denominator)
+
+
+def weighted_overlap_matrix(A, B, top_k=TOP_K):
+    """ Weighted Overlap between all the rows of two matrices, see weighted_overlap().
+
+    Ranks of the top dimensions of B are stored in a dense (dimensions x m) matrix (0 for the other dimensions),
+    then for each rank of A the ranks in B of the dimensions with that rank are gathered at once and
+    their WO terms are looked up in a table of 1 / (rank + rank in B).
+    """
+    top_A, top_B = _top_dimensions(A, top_k), _top_dimensions(B, top_k)
+    ranks_B = np.zeros(B.T.shape, dtype=np.intp)
+    np.put_along_axis(ranks_B, top_B.T, np.arange(1, top_B.shape[1] + 1)[:, None], axis=0)
+    ranks = np.arange(1, top_B.shape[1] + 1)
+
+    numerator = np.zeros((len(A), len(B)))
+    overlap = np.zeros((len(A), len(B)), dtype=np.intp)
+    for rank in range(1, top_A.shape[1] + 1):
+        shared_ranks = ranks_B[top_A[:, rank - 1]] # (n x m) ranks in B, 0 if not shared
+        numerator += np.concatenate(([0.0], 1 / (rank + ranks)))[shared_ranks]
+        overlap += shared_ranks > 0
+
+    return np.sqrt(numerator / _overlap_normalization(top_k)[overlap])
+
+
+def weighted_overlap_paired(vectors, top_k=TOP_K):
+    """ Paired form of weighted_overlap(), see register_kernel().
+    """
+    shared_ranks, n_top = _shared_ranks_paired(vectors, top_k)
+    terms = 1 / (np.arange(1, n_top + 1)[None, :] + np.arange(n_top + 1)[:, None]) # (rank in right x rank in left)
+    terms[0] = 0.0 # dimensions not shared
+    normalization = _overlap_normalization(top_k)
+
+    def paired(left, right):
+        ranks = shared_ranks(left, right)
+        numerator = terms[ranks, np.arange(n_top)].sum(axis=1)
+        return np.sqrt(numerator / normalization[(ranks > 0).sum(axis=1)])
+
+    return paired
+
+
+def jaccard_similarity(v1, v2, top_k=TOP_K):
+    """ Jaccard similarity between the sets of the top_k largest dimensions of two vectors.
+    """
+    dims1 = set(_top_dimensions(np.atleast_2d(v1), top_k)[0].tolist())
+    dims2 = set(_top_dimensions(np.atleast_2d(v2), top_k)[0].tolist())
+    return len(dims1 & dims2) / len(dims1 | dims2)
+
+
+def jaccard_similarity_matrix(A, B, top_k=TOP_K):
+    """ Jaccard similarity on top_k dimensions between all the rows of two matrices, see jaccard_similarity().
+
+    The size of each intersection is a product of the (rows x dimensions) indicator matrices of the top dimensions.
+    """
+    indicator_A, indicator_B = np.zeros(A.shape), np.zeros(B.shape)
+    np.put_along_axis(indicator_A, _top_dimensions(A, top_k), 1.0, axis=1)
+    np.put_along_axis(indicator_B, _top_dimensions(B, top_k), 1.0, axis=1)
+
+    intersection = indicator_A @ indicator_B.T
+    union = indicator_A.sum(axis=1)[:, None] + indicator_B.sum(axis=1)[None, :] - intersection
+    return intersection / union
+
+
+def jaccard_similarity_paired(vectors, top_k=TOP_K):
+    """ Paired form of jaccard_similarity(), see register_kernel().
+    """
+    shared_ranks, n_top = _shared_ranks_paired(vectors, top_k)
+
+    def paired(left, right):
+        intersection = (shared_ranks(left, right) > 0).sum(axis=1)
+        return intersection / (2 * n_top - intersection)
+
+    return paired
+
+
+SimilarityKernel = namedtuple('SimilarityKernel', ['name', 'scalar', 'matrix', 'paired'])
+KERNELS = {} # name -> SimilarityKernel
+
+
+def register_kernel(name, scalar, matrix=None, paired=None):
+    """ Register a similarity kernel, usable by name or by its scalar function in sense_similarity().
+
+    Args:
+        name (str): kernel name.
+        scalar (callable): similarity function with (numpy.ndarray, numpy.ndarray) -> float signature.
+        matrix (callable, optional): similarity function between all the rows of two matrices, with 
+            (numpy.ndarray, numpy.ndarray) -> numpy.ndarray signature. Defaults to None (scalar only kernel).
+        paired (callable, optional): similarity of many pairs of vectors gathered from the same matrix, with
+            numpy.ndarray -> callable signature: given a (vectors x dimensions) matrix it computes the features of
+            each vector once (eg. norms or top dimensions) and returns a function with (numpy.ndarray, numpy.ndarray)
+            -> numpy.ndarray signature, the similarity of each pair of (left, right) row indexes. Defaults to None.
+
+    Returns:
+        SimilarityKernel: the registered kernel.
+    """
+    KERNELS[name] = SimilarityKernel(name, scalar, matrix, paired)
+    return KERNELS[name]
+
+
+def get_kernel(similarity_func):
+    """ Registered kernel of a similarity function.
+
+    Args:
+        similarity_func (callable or str): kernel name or scalar function.
+
+    Returns:
+        SimilarityKernel: the kernel, None if the function is not registered.
+    """
+    if isinstance(similarity_func, str):
+        return KERNELS.get(similarity_func)
+    return next((kernel for kernel in KERNELS.values() if kernel.scalar is similarity_func), None)
+
+
+register_kernel('cosine', cosine_similarity, cosine_similarity_matrix, cosine_similarity_paired)
+register_kernel('dot', dot_similarity, dot_similarity_matrix, dot_similarity_paired)
+register_kernel('euclidean', euclidean_similarity, euclidean_similarity_matrix, euclidean_similarity_paired)
+register_kernel('weighted_overlap', weighted_overlap, weighted_overlap_matrix, weighted_overlap_paired)
+register_kernel('jaccard', jaccard_similarity, jaccard_similarity_matrix, jaccard_similarity_paired)
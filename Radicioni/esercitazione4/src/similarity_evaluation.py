@@ -0,0 +1,287 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import stats
+
+import src.data_manager as dm
+import src.sense_similarity as sim
+
+"""
+Evaluation of the sense similarity against the gold scores of data/words_annotations.tsv (WordSim-style).
+
+All the lemmas are resolved once to the rows of their sense vectors, then the sense pairs of all the
+word pairs are laid out in flat (left row, right row) arrays, where the sense pairs of each word pair
+are a contiguous segment. Each similarity kernel (see sense_similarity.KERNELS) computes the features of the
+distinct sense vectors once, then its paired form scores all the flat sense pairs in a few large blocks,
+and the score of a word pair is the max of its segment.
+Many similarity functions can be evaluated side by side, the report (Pearson and Spearman correlation,
+coverage and pairs/sec of each function, optionally the speed-up over the scalar form) is emitted as JSON.
+The script must be executed from the esercitazione4 directory:
+
+    python -m src.similarity_evaluation --scalar-reference --output output/similarity_evaluation.json
+
+With --quantization int8 float16 the report is instead the accuracy delta of the quantized nasari matrices.
+"""
+
+
+def paired_scalar(similarity_func):
+    """ Paired form of a scalar similarity function: the similarity of each pair of rows of two matrices.
+
+    Args:
+        similarity_func (callable): similarity function with (numpy.ndarray, numpy.ndarray) -> float signature.
+
+    Returns:
+        callable: similarity function with (numpy.ndarray, numpy.ndarray) -> numpy.ndarray signature.
+    """
+    def paired(A, B):
+        return np.array([similarity_func(v1, v2) for v1, v2 in zip(A, B)], dtype=np.float64)
+
+    return paired
+
+
+def read_annotations(annotations_path):
+    """ Read the gold word similarity annotations file.
+
+    Returns:
+        (list of (str, str), numpy.ndarray): lemma pairs and their gold scores.
+    """
+    with annotations_path.open('r', newline='') as file:
+        rows = list(csv.DictReader(file, delimiter='\t'))
+    return [(row['lemma1'], row['lemma2']) for row in rows], np.array([float(row['score']) for row in rows])
+
+
+def resolve_pairs(word_pairs, nasari):
+    """ Lay out the sense pairs of the given word pairs in flat arrays.
+
+    Args:
+        word_pairs (list of (str, str)): word pairs.
+        nasari (data_manger.Nasari): a Nasari lexical resource instance with a mapper.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray): distinct nasari rows of all the senses,
+            left and right indexes (in the distinct rows) of all the sense pairs, offsets of the segment of each
+            word pair (sense pairs of pair k are offsets[k]:offsets[k + 1]) and (pairs x 2) number of senses of each word.
+    """
+    words = {} # word -> indexes of its senses in the distinct rows
+    rows = []
+    for word in (word for pair in word_pairs for word in pair):
+        if word not in words:
+            _, word_rows = nasari.get_lemma_rows(word)
+            words[word] = np.arange(len(rows), len(rows) + len(word_rows))
+            rows.extend(word_rows)
+
+    counts = np.array([(len(words[word1]), len(words[word2])) for word1, word2 in word_pairs], dtype=np.int64).reshape(-1, 2)
+    offsets = np.concatenate([[0], np.cumsum(counts[:, 0] * counts[:, 1])])
+    left = np.empty(offsets[-1], dtype=np.int64)
+    right = np.empty(offsets[-1], dtype=np.int64)
+    for k, (word1, word2) in enumerate(word_pairs): # row-major sense pairs, like itertools.product
+        left[offsets[k]:offsets[k + 1]] = np.repeat(words[word1], len(words[word2]))
+        right[offsets[k]:offsets[k + 1]] = np.tile(words[word2], len(words[word1]))
+
+    return np.array(rows, dtype=np.int64), left, right, offsets, counts
+
+
+def segment_max(scores, offsets):
+    """ Max score of each segment and position of its first max (up to sense_similarity.TIE_TOLERANCE).
+
+    Args:
+        scores (numpy.ndarray): scores of all the segments.
+        offsets (numpy.ndarray): offsets of the segments, empty segments are allowed.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): max score of each segment (nan if empty) and index in scores of the max (-1 if empty).
+    """
+    n_segments = len(offsets) - 1
+    lengths = np.diff(offsets)
+    filled = lengths > 0
+
+    max_scores = np.full(n_segments, np.nan)
+    best = np.full(n_segments, -1, dtype=np.int64)
+    if not filled.any():
+        return max_scores, best
+
+    max_scores[filled] = np.maximum.reduceat(scores, offsets[:-1][filled])
+    segments = np.repeat(np.arange(n_segments), lengths)
+    candidates = np.flatnonzero(scores >= max_scores[segments] - sim.TIE_TOLERANCE)
+    first_segments, first = np.unique(segments[candidates], return_index=True) # candidates are sorted, so the first is kept
+    best[first_segments] = candidates[first]
+
+    return max_scores, best
+
+
+def pairs_similarity(vectors, left, right, offsets, counts, similarity_func, block_size=65536, use_matrix=True):
+    """ Sense similarity of each word pair, as max similarity among its sense pairs.
+
+    Args:
+        vectors (numpy.ndarray): (senses x dimensions) vectors of the distinct senses.
+        left (numpy.ndarray): sense of the first word of each sense pair.
+        right (numpy.ndarray): sense of the second word of each sense pair.
+        offsets (numpy.ndarray): offsets of the segment of each word pair.
+        counts (numpy.ndarray): (pairs x 2) number of senses of each word.
+        similarity_func (callable, str or sense_similarity.SimilarityKernel): similarity function (scalar or registered kernel).
+            The paired form of a kernel is used when available, then its matrix form, otherwise sense pairs are scored one by one.
+        block_size (int, optional): number of sense pairs scored at once by paired and scalar functions, to bound memory. Defaults to 65536.
+        use_matrix (bool, optional): use the vectorized (paired or matrix) forms of kernels. Defaults to True (False to time the scalar form).
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): score of each word pair (nan if a word has no sense vectors) and index of its best sense pair.
+    """
+    kernel = similarity_func if isinstance(similarity_func, sim.SimilarityKernel) else sim.get_kernel(similarity_func)
+    scores = np.empty(len(left), dtype=np.float64)
+
+    if use_matrix and kernel is not None and kernel.paired is not None:
+        paired = kernel.paired(vectors) # features of the distinct senses computed once
+        for start in range(0, len(left), block_size):
+            end = start + block_size
+            scores[start:end] = paired(left[start:end], right[start:end])
+    elif use_matrix and kernel is not None and kernel.matrix is not None:
+        # kernels without a paired form: one call for each word pair, its (senses1 x senses2) scores are its row-major segment
+        for start, (n1, n2) in zip(offsets[:-1].tolist(), counts.tolist()):
+            if n1 and n2:
+                senses1, senses2 = left[start:start + n1 * n2:n2], right[start:start + n2]
+                scores[start:start + n1 * n2] = kernel.matrix(vectors[senses1], vectors[senses2]).ravel()
+    else:
+        paired = paired_scalar(kernel.scalar if kernel is not None else similarity_func)
+        for start in range(0, len(left), block_size):
+            end = start + block_size
+            scores[start:end] = paired(vectors[left[start:end]], vectors[right[start:end]])
+
+    return segment_max(scores, offsets)
+
+
+def correlations(gold, predicted):
+    """ Pearson and Spearman correlation between gold and predicted scores, word pairs without a prediction are skipped.
+    """
+    scored = ~np.isnan(predicted)
+    if scored.sum() < 2:
+        return {'pearson': None, 'spearman': None}
+
+    return {'pearson': float(stats.pearsonr(gold[scored], predicted[scored])[0]),
+            'spearman': float(stats.spearmanr(gold[scored], predicted[scored])[0])}
+
+
+def evaluate_similarity(word_pairs, gold, nasari, similarity_funcs=None, scalar_reference=False):
+    """ Evaluate many similarity functions against the gold scores.
+
+    Args:
+        word_pairs (list of (str, str)): annotated word pairs.
+        gold (numpy.ndarray): gold score of each word pair.
+        nasari (data_manger.Nasari): a Nasari lexical resource instance with a mapper.
+        similarity_funcs (dict, optional): name -> similarity function (scalar or kernel). Defaults to None (all registered kernels).
+        scalar_reference (bool, optional): also time the scalar form of kernels with a vectorized form, to report its speed-up. Defaults to False.
+
+    Returns:
+        dict: number of pairs and resolution time, then correlations, number of scored pairs, elapsed time and pairs/sec of each function.
+    """
+    similarity_funcs = similarity_funcs or dict(sim.KERNELS)
+
+    start = time.perf_counter()
+    rows, left, right, offsets, counts = resolve_pairs(word_pairs, nasari)
+    vectors = nasari.vectors(rows)
+    resolve_elapsed = time.perf_counter() - start
+
+    def timed_scores(similarity_func, use_matrix=True):
+        start = time.perf_counter()
+        scores, _ = pairs_similarity(vectors, left, right, offsets, counts, similarity_func, use_matrix=use_matrix)
+        return scores, time.perf_counter() - start
+
+    report = {'pairs': len(word_pairs), 'sense_pairs': len(left), 'resolve_elapsed': resolve_elapsed, 'functions': {}}
+    for name, similarity_func in similarity_funcs.items():
+        scores, elapsed = timed_scores(similarity_func)
+        function_report = {**correlations(gold, scores),
+                           'scored_pairs': int((~np.isnan(scores)).sum()),
+                           'elapsed': elapsed,
+                           'pairs_per_sec': len(word_pairs) / elapsed if elapsed else 0.0}
+
+        kernel = similarity_func if isinstance(similarity_func, sim.SimilarityKernel) else sim.get_kernel(similarity_func)
+        if scalar_reference and kernel is not None and (kernel.paired is not None or kernel.matrix is not None):
+            scalar_scores, scalar_elapsed = timed_scores(kernel, use_matrix=False)
+            function_report['scalar_elapsed'] = scalar_elapsed
+            function_report['speedup'] = scalar_elapsed / elapsed if elapsed else None
+            function_report['max_scalar_difference'] = float(np.nanmax(np.abs(scores - scalar_scores), initial=0.0))
+
+        report['functions'][name] = function_report
+
+    return report
+
+
+def evaluate_quantization(word_pairs, gold, nasari, quantized, similarity_funcs=None):
+    """ Accuracy delta of quantized nasari matrices wrt the float32 one.
+
+    Args:
+        word_pairs (list of (str, str)): annotated word pairs.
+        gold (numpy.ndarray): gold score of each word pair.
+        nasari (data_manger.Nasari): float32 Nasari lexical resource instance with a mapper.
+        quantized (list of data_manger.Nasari): quantized versions of the same resource.
+        similarity_funcs (dict, optional): name -> similarity function (scalar or kernel). Defaults to None (all registered kernels).
+
+    Returns:
+        dict: for each quantization, matrix size and compression ratio, then for each function the correlations and their
+            delta wrt float32, the max score difference and the fraction of word pairs with the same best sense pair.
+    """
+    similarity_funcs = similarity_funcs or dict(sim.KERNELS)
+    rows, left, right, offsets, counts = resolve_pairs(word_pairs, nasari)
+
+    def scores(nasari, similarity_func): # same layout for all versions, rows are the same
+        return pairs_similarity(nasari.vectors(rows), left, right, offsets, counts, similarity_func)
+
+    reference = {name: scores(nasari, similarity_func) for name, similarity_func in similarity_funcs.items()}
+    report = {'float32': {'nbytes': nasari.nbytes, 
+                          'functions': {name: correlations(gold, reference_scores) for name, (reference_scores, _) in reference.items()}}}
+
+    for quantized_nasari in quantized:
+        quantization_report = {'nbytes': quantized_nasari.nbytes, 
+                               'compression': nasari.nbytes / quantized_nasari.nbytes if quantized_nasari.nbytes else None,
+                               'functions': {}}
+
+        for name, similarity_func in similarity_funcs.items():
+            (reference_scores, reference_best), (quantized_scores, quantized_best) = reference[name], scores(quantized_nasari, similarity_func)
+            function_report = correlations(gold, quantized_scores)
+            for metric in ('pearson', 'spearman'):
+                reference_value = report['float32']['functions'][name][metric]
+                function_report[metric + '_delta'] = (function_report[metric] - reference_value 
+                                                      if function_report[metric] is not None and reference_value is not None else None)
+            scored = reference_best >= 0
+            function_report['max_score_difference'] = float(np.max(np.abs(quantized_scores - reference_scores)[scored], initial=0.0))
+            function_report['same_senses'] = float(np.mean(quantized_best[scored] == reference_best[scored])) if scored.any() else None
+
+            quantization_report['functions'][name] = function_report
+
+        report[quantized_nasari.quantization] = quantization_report
+
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evaluate sense similarity against gold word similarity annotations')
+    parser.add_argument('--annotations', type=Path, default=Path('data/words_annotations.tsv'))
+    parser.add_argument('--semeval', type=Path, default=Path('data/SemEval17_IT_senses2synsets.txt'))
+    parser.add_argument('--nasari', type=Path, default=Path('data/mini_NASARI.tsv'))
+    parser.add_argument('--kernels', nargs='+', default=list(sim.KERNELS), choices=list(sim.KERNELS))
+    parser.add_argument('--scalar-reference', action='store_true', help='also time the scalar form of each kernel, to report the speed-up')
+    parser.add_argument('--quantization', nargs='+', default=None, choices=list(dm.QUANTIZATIONS),
+                        help='report the accuracy delta of quantized nasari matrices instead')
+    parser.add_argument('--output', type=Path, default=None, help='optional json file where to save the report')
+    args = parser.parse_args()
+
+    semeval = dm.SemEval(args.semeval)
+    nasari = dm.Nasari(args.nasari, mapper=semeval)
+    similarity_funcs = {name: sim.KERNELS[name] for name in args.kernels}
+
+    word_pairs, gold = read_annotations(args.annotations)
+    if args.quantization:
+        quantized = [dm.Nasari(args.nasari, mapper=semeval, quantization=quantization) for quantization in args.quantization]
+        report = evaluate_quantization(word_pairs, gold, nasari, quantized, similarity_funcs)
+    else:
+        report = evaluate_similarity(word_pairs, gold, nasari, similarity_funcs, args.scalar_reference)
+    report = json.dumps(report, indent=2)
+    print(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(report)
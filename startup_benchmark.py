@@ -0,0 +1,39 @@
+"""Quick script to measure the cold-start (import) time of the src modules of each exercise.
+Each import is executed in a fresh interpreter with the exercise directory as working directory,
+like the notebooks do. Just call script with
+python startup_benchmark.py [number of runs]
+"""
+
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+MODULES = [('Radicioni/esercitazione1', 'src.word_sense_disambiguation'),
+           ('Radicioni/esercitazione2', 'src.mapping'),
+           ('Radicioni/esercitazione3', 'src.topic_extraction'),
+           ('DiCaro/esercitazione1', 'src.similarity'),
+           ('DiCaro/esercitazione2', 'src.content_to_form'),
+           ('DiCaro/esercitazione4', 'src.text_segmentation')]
+
+TIMER = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)"
+
+root = Path(__file__).resolve().parent
+
+print("{:<28}{:<32}{:>10}{:>10}".format('exercise', 'module', 'median', 'max'))
+for exercise, module in MODULES:
+    timings = []
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, '-c', TIMER.format(module)], cwd=root / exercise,
+                                capture_output=True, text=True)
+        if result.returncode != 0: # eg. missing dependencies
+            timings = None
+            break
+        timings.append(float(result.stdout.splitlines()[-1]))
+
+    if timings is None:
+        print("{:<28}{:<32}{:>20}".format(exercise, module, 'import error'))
+    else:
+        print("{:<28}{:<32}{:>9.3f}s{:>9.3f}s".format(exercise, module, statistics.median(timings), max(timings)))
@@ -0,0 +1,6 @@
+"""
+Code shared by the exercises: lazy lexical resources loaders, the bag-of-words text pipeline and an LRU cache.
+
+Install it once from the repository root with `pip install -e .` (or put the repository root on PYTHONPATH),
+then modules import it as tln_common.<module> from any exercise directory.
+"""
@@ -0,0 +1,83 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+"""
+Bounded LRU cache of immutable values, with optional on-disk persistence.
+
+The cache is safe to share among the threads of a process: lookups and updates are done under a lock,
+while values are built outside of it, so threads missing different keys build them concurrently.
+Concurrent misses of the same key build the value more than once, the last one built is kept.
+The cache is not shared among processes: each process (eg. each worker of a ProcessPoolExecutor)
+has its own copy, and save() of different processes overwrite each other.
+"""
+
+
+class LRUCache():
+    """Bounded LRU cache, the least recently used entries are discarded when the cache is full.
+    Cached values are shared among callers, so they should be immutable (eg. frozensets).
+    """
+
+    def __init__(self, maxsize, path=None):
+        """
+        Args:
+            maxsize (int): max number of cached entries.
+            path (pathlib.Path, optional): file where the cache is persisted, loaded if it already exists. Defaults to None.
+        """
+        self._maxsize = maxsize
+        self._path = path
+        self._entries = OrderedDict() # key -> value, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if path and Path(path).exists():
+            with Path(path).open('rb') as file:
+                self._entries.update(pickle.load(file))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build_value):
+        """Get the value associated to key, building and caching it on a cache miss.
+
+        Args:
+            key (hashable): key of the value.
+            build_value (callable): function without arguments that build the value.
+
+        Returns:
+            object: the cached value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        value = build_value() # outside the lock, so threads build values concurrently
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False) # discard least recently used
+
+        return value
+
+    def stats(self):
+        """dict: cache hits, misses and size.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def save(self, path=None):
+        """Persist the cache to disk. The file is replaced atomically, so an interrupted save keeps the previous one.
+
+        Args:
+            path (pathlib.Path, optional): destination file. Defaults to None (the path given in the constructor).
+        """
+        path = Path(path or self._path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with self._lock, tmp_path.open('wb') as file:
+            pickle.dump(self._entries, file)
+        os.replace(tmp_path, path)
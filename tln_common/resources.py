@@ -0,0 +1,84 @@
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import nltk
+
+"""
+Lazy loaders for lexical resources.
+
+Resources are loaded on first use and then cached, so importing modules of the src package
+is cheap and doesn't require network access. NLTK packages are downloaded only when they are
+not already installed.
+"""
+
+STOP_WORDS_PATH = Path('data/stop_words_FULL.txt') # relative to the exercise directory
+
+# NLTK package name -> resource path used to check if the package is already installed
+NLTK_RESOURCES = {'punkt': 'tokenizers/punkt',
+                  'stopwords': 'corpora/stopwords',
+                  'wordnet': 'corpora/wordnet',
+                  'framenet_v17': 'corpora/framenet_v17',
+                  'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger'}
+
+_NLTK_LOCK = threading.Lock() # lru_cache doesn't prevent concurrent first calls
+
+
+@lru_cache(maxsize=None)
+def load_stop_words(path=STOP_WORDS_PATH):
+    """Load a stop words file with one word per line.
+
+    Args:
+        path (pathlib.Path, optional): stop words file. Defaults to STOP_WORDS_PATH.
+
+    Returns:
+        frozenset: set of stop words.
+    """
+    with Path(path).open('r') as file:
+        return frozenset(file.read().splitlines())
+
+
+@lru_cache(maxsize=None)
+def require_nltk(package):
+    """Make sure that an NLTK package is installed, the package is downloaded only if missing.
+    Calls after the first one are no-op.
+
+    Args:
+        package (str): NLTK package name (eg. 'punkt').
+    """
+    with _NLTK_LOCK:
+        try:
+            nltk.data.find(NLTK_RESOURCES.get(package, package))
+        except LookupError:
+            nltk.download(package, quiet=True)
+
+
+def load_nltk_corpus(name):
+    """Force the loading of a lazy NLTK corpus (eg. wordnet), installing it if missing.
+    NLTK lazy corpus loaders are not thread-safe on their first access, so corpora used
+    by worker threads should be loaded by the main thread before starting them.
+
+    Args:
+        name (str): corpus name in nltk.corpus, the same of its NLTK package.
+
+    Returns:
+        nltk.corpus.reader.CorpusReader: the loaded corpus.
+    """
+    require_nltk(name)
+    corpus = getattr(nltk.corpus, name)
+    with _NLTK_LOCK:
+        corpus.root # any reader attribute replaces the lazy loader with the actual reader
+    return corpus
+
+
+@lru_cache(maxsize=None)
+def nltk_stop_words(language='english'):
+    """Load NLTK stop words list for the given language.
+
+    Returns:
+        frozenset: set of stop words.
+    """
+    require_nltk('stopwords')
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words(language))
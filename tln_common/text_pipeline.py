@@ -0,0 +1,171 @@
+import threading
+
+import nltk
+
+import tln_common.resources as res
+
+"""
+Shared text normalization pipeline to build bag-of-words (BOW) models.
+
+The pipeline is configured once (punctuation, stop words, lowercasing, sentence splitting and
+lemmatization) and then reused for every text. Lemmas are memoized per surface form and
+every token is interned to an integer id, so bags can also be represented as frozensets of ints.
+
+A pipeline can be shared by many threads: interning and the lazy lemmatizer construction are guarded
+by a lock, while lookups of already interned tokens and memoized lemmas are lock-free. NLTK loads
+punkt and wordnet lazily and its first access is not thread-safe, so call load_resources() on
+the main thread before starting worker threads.
+"""
+
+
+class TextPipeline:
+    """ Configurable bag-of-words pipeline:
+
+    1. optional sentence splitting, then word tokenization.
+    2. optional lowercasing (of each sentence when sentences are splitted, of the whole text otherwise).
+    3. punctuation and stop words removal.
+    4. optional lemmatization.
+    """
+
+    def __init__(self, punctuation=(), stopwords=None, lowercase=True, sentence_split=False, lemmatize=True):
+        """
+        Args:
+            punctuation (iterable of str, optional): tokens to remove. Defaults to ().
+            stopwords (set, optional): default set of stop words to remove. Defaults to None.
+            lowercase (bool, optional): lowercase text before word tokenization. Defaults to True.
+            sentence_split (bool, optional): tokenize sentence by sentence. Defaults to False.
+            lemmatize (bool, optional): lemmatize tokens with WordNet lemmatizer. Defaults to True.
+        """
+        self._punctuation = frozenset(punctuation)
+        self._stopwords = stopwords
+        self._lowercase = lowercase
+        self._sentence_split = sentence_split
+        self._lemmatize = lemmatize
+
+        self._lemmatizer = None # built on first use
+        self._lemmas = {} # surface form -> lemma
+        self._vocabulary = {} # token -> id
+        self._tokens = [] # id -> token
+        self._lock = threading.Lock() # guards interning and lemmatizer construction
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock'] # locks can't be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def load_resources(self):
+        """ Load the NLTK resources used by the pipeline (punkt and, if lemmatization is enabled, wordnet)
+        and build the lemmatizer. Call it on the main thread before sharing the pipeline among threads.
+        """
+        res.require_nltk('punkt')
+        nltk.word_tokenize('load punkt') # punkt tokenizer is loaded on first use
+        if self._lemmatize:
+            self._get_lemmatizer().lemmatize('words')
+
+    def tokenize(self, text):
+        """ Tokenize a text, without any token removal or normalization but lowercasing.
+
+        Args:
+            text (str): text to tokenize.
+
+        Returns:
+            set of str: set of tokens.
+        """
+        res.require_nltk('punkt')
+        tokens = set()
+
+        sentences = nltk.sent_tokenize(text) if self._sentence_split else [text]
+        for sentence in sentences:
+            if self._lowercase:
+                sentence = sentence.lower()
+            tokens.update(nltk.word_tokenize(sentence))
+
+        return tokens
+
+    def bow(self, text, stopwords=None):
+        """ Build the bag of word of a text.
+
+        Args:
+            text (str): text from which build BOW.
+            stopwords (set, optional): stop words to remove instead of the pipeline ones. Defaults to None.
+
+        Returns:
+            set of str: bag of word.
+        """
+        stopwords = stopwords if stopwords is not None else self._stopwords
+
+        tokens = self.tokenize(text).difference(self._punctuation)
+        if stopwords:
+            tokens = tokens.difference(stopwords)
+
+        if self._lemmatize:
+            tokens = set(self.lemma(token) for token in tokens)
+
+        return tokens
+
+    def bow_ids(self, text, stopwords=None):
+        """ Same as bow() but tokens are represented with their interned ids.
+
+        Returns:
+            frozenset of int: bag of word.
+        """
+        return frozenset(self.token_id(token) for token in self.bow(text, stopwords))
+
+    def lemma(self, token):
+        """ Lemmatize a token, lemmas are memoized per surface form.
+        """
+        lemma = self._lemmas.get(token)
+        if lemma is None:
+            lemma = self._get_lemmatizer().lemmatize(token)
+            lemma = self._tokens[self.token_id(lemma)] # keep only one instance of each lemma string
+            self._lemmas[token] = lemma # concurrent misses store the same lemma
+
+        return lemma
+
+    def _get_lemmatizer(self):
+        """ WordNet lemmatizer, built (and wordnet loaded) on first use.
+        """
+        if self._lemmatizer is None:
+            with self._lock:
+                if self._lemmatizer is None:
+                    res.load_nltk_corpus('wordnet')
+                    self._lemmatizer = nltk.WordNetLemmatizer()
+
+        return self._lemmatizer
+
+    def token_id(self, token):
+        """ Get the interned id of a token, a new id is assigned to tokens never seen.
+        """
+        token_id = self._vocabulary.get(token)
+        if token_id is None:
+            with self._lock:
+                token_id = self._vocabulary.get(token) # interned by another thread meanwhile
+                if token_id is None:
+                    token_id = len(self._tokens)
+                    self._tokens.append(token) # published in the vocabulary only when its id is valid
+                    self._vocabulary[token] = token_id
+
+        return token_id
+
+    def lookup_ids(self, tokens):
+        """ Ids of already interned tokens, tokens never seen are discarded.
+
+        Args:
+            tokens (iterable of str): tokens to look up.
+
+        Returns:
+            list of int: token ids.
+        """
+        return [self._vocabulary[token] for token in tokens if token in self._vocabulary]
+
+    def token(self, token_id):
+        """ Get the token string of an interned id.
+        """
+        return self._tokens[token_id]